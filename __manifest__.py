@@ -10,7 +10,7 @@
 Allow clients to Schedule Appointments through the Portal
     """,
     'depends': ['base', 'calendar', 'web', 'resource', 'web_enterprise', 'web_gantt', 'appointment', 'mail','account_payment', 'portal', 
-    'sale', 'sale_loyalty','account' ],
+    'sale', 'sale_loyalty','account', 'auth_oauth' ],
     'installable': True,
     'assets': {
         'web.assets_backend': [
@@ -23,9 +23,14 @@ Allow clients to Schedule Appointments through the Portal
         ],
     },
     'data': [
+        'security/ir.model.access.csv',
         'data/hair_by_ning_sequence.xml',
+        'data/hair_by_ning_cron.xml',
+        'data/hair_by_ning_deposit_tier.xml',
         'views/calendar_views.xml',
         'views/res_partner_views.xml',
+        'views/deposit_tier_views.xml',
+        'views/auth_oauth_provider_views.xml',
     ],
     'license': 'LGPL-3',
 }
@@ -5,3 +5,5 @@ from . import appointment
 from . import shorturl
 from . import portal
 from . import main
+from . import gantt
+from . import invoice
@@ -1,28 +1,50 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
+import hashlib
 import json
 import pytz
-import re
-import requests
 from babel.dates import format_datetime, format_date, format_time
 from dateutil.relativedelta import relativedelta
-from odoo import http, Command, fields
+from odoo import api, http, Command, fields
 from odoo.http import request, Response
 import logging
 from odoo.addons.appointment.controllers.appointment import AppointmentController
-from werkzeug.exceptions import Forbidden, NotFound
+from werkzeug.exceptions import BadRequest, Conflict, Forbidden, NotFound
 from urllib.parse import unquote_plus
 from odoo.tools.mail import is_html_empty
 from odoo.tools.misc import babel_locale_parse, get_lang
 from odoo.addons.base.models.ir_qweb import keep_query
-from datetime import datetime, date
+from datetime import datetime, date, time
 from odoo.tools import config
 from odoo.addons.phone_validation.tools import phone_validation
-from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT as dtf, email_normalize
+from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT as dtf, consteq, email_normalize
 
-from collections import defaultdict
+from ..tools import TurnstileClient, TURNSTILE_VERIFY_URL
 
 _logger = logging.getLogger(__name__)
 
+# Slot requests whose results are not cached
+SLOTS_UNCACHEABLE_KWARGS = ('invite_token',)
+# Maximum number of months streamed by a single /hbn/appointment/slots response
+SLOTS_STREAM_PAGE_MONTHS = 3
+
+
+_turnstile_client = None
+
+
+def _get_turnstile_client():
+    """ Return the Turnstile client of this worker, created on first use so that
+        its connection pool is never shared between forked workers.
+    """
+    global _turnstile_client
+    if _turnstile_client is None:
+        _turnstile_client = TurnstileClient(
+            url=config.get('turnstile_url') or TURNSTILE_VERIFY_URL,
+            timeout=float(config.get('turnstile_timeout') or 3),
+            failure_threshold=int(config.get('turnstile_failure_threshold') or 5),
+            reset_timeout=float(config.get('turnstile_reset_timeout') or 30),
+        )
+    return _turnstile_client
+
 
 def _formated_weekdays(locale):
     """ Return the weekdays' name for the current locale
@@ -60,21 +82,7 @@ class HairByNingAppointmentController(AppointmentController):
 
         kwargs['domain'] = self._appointment_website_domain()
 
-        appointment_type_ids = request.env['appointment.type'].sudo().search(kwargs['domain']).ids
-
-        appointment_types = request.env['appointment.type'].sudo().browse(appointment_type_ids).exists()
-
-        appointment_types = appointment_types.filtered_domain(kwargs['domain'])
-
-        result = defaultdict(list)
-        for appointment in appointment_types:
-            data = {
-                'id': appointment.id,
-                'name': appointment.name,
-                'max_capacity': appointment.resource_count
-            }
-            result[appointment.location].append(data)
-        
+        result = request.env['appointment.type'].sudo()._get_booking_catalogue(request.env.lang, kwargs['domain'])
 
         return {
             'appointment_types' : result,
@@ -100,10 +108,46 @@ class HairByNingAppointmentController(AppointmentController):
         new_context.update({'lang': kwargs['context'].get('lang')})
         request.env.context = new_context
 
+        appointment_type = self._get_slots_appointment_type(kwargs)
+        return {'appointment': self._prepare_appointment_slots_payload(appointment_type, compact=kwargs.get('compact'), **kwargs)}
+
+    @http.route(['/hbn/appointment/appointment_type/<int:appointment_type_id>/slots'],
+           type='http', auth="public", methods=['GET'], website=False, sitemap=False)
+    def appointment_type_time_slots_compact(self, appointment_type_id, lang=None, **kwargs):
+        """
+        GET variant of ``/hbn/appointment/appointment_type`` returning the compact slot format by default.
+        The response carries a strong ETag derived from the availability version of the month, so that
+        the widget can revalidate a month it already has and get a 304 when nothing changed.
+
+        :param appointment_type_id: the appointment_type_id of the appointment type that we want to access
+        :param lang: the language code the slots are formatted in
+        :param compact: '0' to get the full slot dicts instead of the compact format
+        """
+        if lang:
+            request.update_context(lang=lang)
+        kwargs['appointment_type_id'] = appointment_type_id
+        appointment_type = self._get_slots_appointment_type(kwargs)
+        compact = kwargs.get('compact', '1') != '0'
+
+        etag = self._get_slots_etag(appointment_type, compact, **kwargs)
+        if etag and request.httprequest.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        payload = self._prepare_appointment_slots_payload(appointment_type, compact=compact, **kwargs)
+        response = request.make_json_response({'appointment': payload}, headers=[('Cache-Control', 'no-cache')])
+        if etag:
+            response.set_etag(etag)
+        return response
+
+    def _get_slots_appointment_type(self, kwargs):
+        """
+        Return the appointment type asked by the slot routes, among the ones the visitor can access.
+        ``kwargs`` is completed with the domain and the available appointment types, as expected by
+        ``_prepare_appointment_type_page_values``.
+        """
         appointment_type_id = kwargs.get('appointment_type_id', False)
-        staff_user_id = kwargs.get('staff_user_id')
-        resource_selected_id = kwargs.get('resource_selected_id')
-        state = kwargs.get('state')
 
         kwargs['domain'] = self._appointments_base_domain(
             filter_appointment_type_ids=kwargs.get('filter_appointment_type_ids'),
@@ -123,15 +167,20 @@ class HairByNingAppointmentController(AppointmentController):
         kwargs['available_appointments'] = available_appointments
         if not appointment_type:
             raise NotFound()
+        return appointment_type
 
-        page_values = self._prepare_appointment_type_page_values(appointment_type, staff_user_id, resource_selected_id, **kwargs)
-        time_slots = self._get_appointment_type_time_slots(appointment_type, page_values, state, **kwargs)
-        slots = []
-        for slot in time_slots["slots"]:
-            for week in slot["weeks"]:
-                for day in week:
-                    if(len(day['slots']) > 0):
-                        slots.append(day)
+    def _prepare_appointment_slots_payload(self, appointment_type, compact=False, **kwargs):
+        """
+        Build the appointment and slots values sent to the booking widget.
+
+        :param appointment_type: the appointment type that we want to access.
+        :param compact: return the slots in the compact format of ``_compact_slot_days`` and the
+            variants as a list instead of a JSON string.
+        """
+        staff_user_id = kwargs.get('staff_user_id')
+        resource_selected_id = kwargs.get('resource_selected_id')
+        state = kwargs.get('state')
+        slots = self._get_appointment_type_slot_days(appointment_type, staff_user_id, resource_selected_id, state, **kwargs)
 
         product_tmpl_id = appointment_type.product_id.product_tmpl_id
 
@@ -143,21 +192,250 @@ class HairByNingAppointmentController(AppointmentController):
                 'price_extra': product_variant.price_extra
             })
 
-        appointment = {
+        return {
             "appointment_type_id": appointment_type.id, 
             "name": appointment_type.name, 
             "location_str": appointment_type.location, 
             "duration_str": int(appointment_type.appointment_duration), 
             "appointment_tz": appointment_type.appointment_tz, 
             "assign_method": appointment_type.assign_method, 
-            "asked_capacity": page_values["asked_capacity"], 
-            "slots": slots,
+            "asked_capacity": int(kwargs.get('asked_capacity') or 1),
+            "slots": self._compact_slot_days(slots) if compact else slots,
             "service_name": product_tmpl_id.display_name,
             "list_price": product_tmpl_id.list_price,
-            "product_variants": json.dumps(product_variants),
+            "product_variants": product_variants if compact else json.dumps(product_variants),
             "attribute_name": product_tmpl_id.attribute_line_ids.display_name,
         }
-        return {'appointment': appointment}
+
+    def _compact_slot_days(self, days):
+        """
+        Encode the available days in a columnar format:
+
+            {
+                'format': 'compact',
+                'durations': [1.5, ...],                         # distinct slot durations (hours)
+                'resources': [{'id': 3, 'name': 'Chair 1', 'capacity': 1}, ...],
+                'days': [{
+                    'day': '2026-10-20',
+                    'starts': [660, 90, 90],                     # minutes since midnight, delta-encoded
+                    'durations': [0, 0, 0],                      # index in ``durations``
+                    'resources': [[0, 1], [1], [0]],             # indexes in ``resources``
+                }, ...],
+            }
+        """
+        durations, duration_index = [], {}
+        resources, resource_index = [], {}
+        compact_days = []
+        for day in days:
+            starts, day_durations, day_resources = [], [], []
+            previous_start = 0
+            for slot in day['slots']:
+                slot_start = datetime.strptime(slot['datetime'], dtf)
+                start = slot_start.hour * 60 + slot_start.minute
+                starts.append(start - previous_start)
+                previous_start = start
+
+                duration = slot.get('slot_duration')
+                if duration not in duration_index:
+                    duration_index[duration] = len(durations)
+                    durations.append(duration)
+                day_durations.append(duration_index[duration])
+
+                slot_resources = []
+                for resource in slot.get('available_resources', []):
+                    if resource['id'] not in resource_index:
+                        resource_index[resource['id']] = len(resources)
+                        resources.append(resource)
+                    slot_resources.append(resource_index[resource['id']])
+                day_resources.append(slot_resources)
+
+            compact_days.append({
+                'day': day['day'],
+                'starts': starts,
+                'durations': day_durations,
+                'resources': day_resources,
+            })
+        return {
+            'format': 'compact',
+            'durations': durations,
+            'resources': resources,
+            'days': compact_days,
+        }
+
+    def _get_slots_etag(self, appointment_type, compact, **kwargs):
+        """
+        Return a strong ETag for the slots payload of ``appointment_type``, derived from everything the
+        cached slots are keyed on and from the availability version of the reference month. Returns
+        False for requests whose slots are not cached.
+        """
+        if any(kwargs.get(key) for key in SLOTS_UNCACHEABLE_KWARGS):
+            return False
+        reference_date = self._get_slots_reference_date(kwargs.get('date'))
+        product_tmpl = appointment_type.product_id.product_tmpl_id
+        write_dates = [appointment_type.write_date, product_tmpl.write_date] + \
+            product_tmpl.product_variant_ids.product_template_attribute_value_ids.mapped('write_date')
+        version = [
+            request.env.cr.dbname,
+            appointment_type.id,
+            reference_date,
+            self._get_slots_filters(kwargs.get('staff_user_id'), kwargs.get('resource_selected_id'), **kwargs),
+            int(kwargs.get('asked_capacity') or 1),
+            self._get_default_timezone(appointment_type),
+            request.env.lang,
+            bool(compact),
+            appointment_type._get_slots_version(reference_date.replace(day=1)),
+            max(filter(None, write_dates), default=False),
+        ]
+        return hashlib.sha256(json.dumps(version, default=str).encode()).hexdigest()
+
+    def _get_appointment_type_slot_days(self, appointment_type, staff_user_id, resource_selected_id, state=False, **kwargs):
+        """
+        Return the days having at least one available slot for the appointment page.
+
+        When the request does not come from an invitation, the days are cached per appointment
+        type, reference date, staff and resource filters, asked capacity, timezone and language
+        until a booking touching them changes (see ``appointment.type._get_cached_slots``).
+        """
+        def compute():
+            page_values = self._prepare_appointment_type_page_values(appointment_type, staff_user_id, resource_selected_id, **kwargs)
+            time_slots = self._get_appointment_type_time_slots(appointment_type, page_values, state, **kwargs)
+            return [
+                day
+                for month in time_slots["slots"]
+                for week in month["weeks"]
+                for day in week
+                if day['slots']
+            ]
+
+        if any(kwargs.get(key) for key in SLOTS_UNCACHEABLE_KWARGS):
+            return compute()
+
+        timezone = self._get_default_timezone(appointment_type)
+        request.session.timezone = timezone
+        return appointment_type._get_cached_slots(
+            self._get_slots_reference_date(kwargs.get('date')),
+            int(kwargs.get('asked_capacity') or 1),
+            timezone,
+            request.env.lang,
+            compute,
+            filters=self._get_slots_filters(staff_user_id, resource_selected_id, **kwargs),
+        )
+
+    def _get_slots_filters(self, staff_user_id, resource_selected_id, **kwargs):
+        """ Return the staff and resource filters of a slot request, as a hashable cache key. """
+        return (
+            staff_user_id or False,
+            resource_selected_id or False,
+            kwargs.get('filter_staff_user_ids') or False,
+            kwargs.get('filter_resource_ids') or False,
+        )
+
+    def _get_slots_reference_date(self, date_str):
+        """ Return the day of the ``date`` kwarg the slots are computed from, or today. """
+        try:
+            return datetime.strptime(date_str or "", "%Y-%m-%d").date()
+        except ValueError:
+            return fields.Date.today()
+
+    @http.route(['/hbn/appointment/slots'],
+           type='http', auth="public", methods=['GET'], website=False, sitemap=False)
+    def appointment_slots_stream(self, appointment_type_id, start, end, cursor=None, lang=None, **kwargs):
+        """
+        Stream the available days of an appointment type between two dates as newline-delimited JSON,
+        one line per month, so that the widget can render every month as soon as it is received. Each
+        month is computed (or read from the cache) right before its line is sent:
+
+            {"month": "2026-10-01", "days": [...]}
+            {"month": "2026-11-01", "days": [...]}
+            {"cursor": "2026-12-01"}
+
+        A response covers at most ``SLOTS_STREAM_PAGE_MONTHS`` months. The last line gives the cursor to
+        pass to get the following months, or null once ``end`` (or the booking horizon) is reached.
+
+        :param appointment_type_id: the appointment type that we want to access
+        :param start: first day of the range, as YYYY-MM-DD
+        :param end: last day of the range, as YYYY-MM-DD
+        :param cursor: month to resume from, as returned by the previous page
+        :param lang: the language code the slots are formatted in
+        :param asked_capacity: the capacity asked by the customer
+        :param compact: '1' to get the days in the format of ``_compact_slot_days``
+        """
+        if lang:
+            request.update_context(lang=lang)
+        kwargs['appointment_type_id'] = appointment_type_id
+        appointment_type = self._get_slots_appointment_type(kwargs)
+        try:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date()
+            end_date = datetime.strptime(end, "%Y-%m-%d").date()
+            first_month = datetime.strptime(cursor, "%Y-%m-%d").date() if cursor else start_date.replace(day=1)
+        except ValueError:
+            raise BadRequest()
+
+        horizon = fields.Date.today() + relativedelta(days=appointment_type.max_schedule_days or 0)
+        last_month = min(end_date, horizon).replace(day=1)
+        months = []
+        month = first_month
+        while month <= last_month and len(months) < SLOTS_STREAM_PAGE_MONTHS:
+            months.append(month)
+            month += relativedelta(months=1)
+        next_cursor = month if month <= last_month else None
+
+        timezone = self._get_default_timezone(appointment_type)
+        request.session.timezone = timezone
+        asked_capacity = int(kwargs.get('asked_capacity') or 1)
+        compact = kwargs.get('compact') == '1'
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+
+        def generate():
+            # The response is consumed after the request cursor is closed: use a cursor of our own
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                appointment_type_env = appointment_type.with_env(env).sudo()
+                for month in months:
+                    days = [
+                        day for day in self._get_month_slot_days(appointment_type_env, month, asked_capacity, timezone)
+                        if start_date <= day['day'] <= end_date
+                    ]
+                    yield json.dumps({
+                        'month': month,
+                        'days': self._compact_slot_days(days) if compact else days,
+                    }, default=str) + '\n'
+                yield json.dumps({'cursor': next_cursor}, default=str) + '\n'
+
+        return Response(generate(), mimetype='application/x-ndjson', direct_passthrough=True,
+                        headers=[('Cache-Control', 'no-cache')])
+
+    def _get_month_slot_days(self, appointment_type, month, asked_capacity, timezone):
+        """
+        Return the days of ``month`` having at least one available slot, without relying on the
+        request (see ``appointment_slots_stream``). Only the slots of that month are computed, from
+        now at the earliest and until the booking horizon of ``appointment_type`` at the latest, and
+        they are cached apart from the ones of ``_get_appointment_type_slot_days``.
+        """
+        now = datetime.utcnow()
+        next_month = month + relativedelta(months=1)
+        # a day of margin on each side: the month is computed in UTC, the days are in ``timezone``
+        reference_date = max(now, datetime.combine(month, time.min) - relativedelta(days=1, hours=appointment_type.min_schedule_hours))
+        until = min(
+            datetime.combine(next_month, time.min) + relativedelta(days=1),
+            now + relativedelta(days=appointment_type.max_schedule_days or 0),
+        )
+
+        def compute():
+            slots = appointment_type.with_context(hbn_slots_until=until)._get_appointment_slots(
+                timezone, asked_capacity=asked_capacity, reference_date=reference_date,
+            )
+            return [
+                day
+                for slot_month in slots
+                for week in slot_month["weeks"]
+                for day in week
+                if day['slots'] and month <= day['day'] < next_month
+            ]
+
+        return appointment_type._get_cached_slots(
+            month, asked_capacity, timezone, appointment_type.env.lang, compute, filters=('month',),
+        )
 
     def _get_appointment_type_time_slots(self, appointment_type, page_values, state=False, **kwargs):
         """
@@ -327,7 +605,40 @@ class HairByNingAppointmentController(AppointmentController):
         :param asked_capacity: asked capacity for the appointment
         :param str guest_emails: optional line-separated guest emails. It will
           fetch or create partners to add them as event attendees;
+        :param idempotency_key: optional key (or ``Idempotency-Key`` header) identifying the
+          submission: a retry with the same key returns the original response without
+          booking again, a concurrent duplicate waits for the original to finish. Keys are
+          scoped to the visitor; failed submissions release their key.
+        """
+        idempotency_key = kwargs.get('idempotency_key') or request.httprequest.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return self._json_appointment_form_submit(**kwargs)
+
+        IdempotencyKey = request.env['hbn.idempotency.key'].sudo()
+        scope = self._get_idempotency_scope('appointment_submit')
+        claimed, response = IdempotencyKey._claim(scope, idempotency_key)
+        if not claimed:
+            if response is None:
+                raise Conflict()
+            return response
+        response = self._json_appointment_form_submit(**kwargs)
+        # Only successful bookings are replayed: a retry of a failed submission must run again
+        if isinstance(response, dict) and response.get('status') != 'error':
+            return IdempotencyKey._store(scope, idempotency_key, response)
+        IdempotencyKey._release(scope, idempotency_key)
+        return response
+
+    def _get_idempotency_scope(self, name):
+        """ Return the scope of the idempotency keys sent to the ``name`` route by the visitor:
+            their partner when they are logged in, otherwise their session, so that a key sent
+            by someone else never replays the response of another visitor.
         """
+        if not request.env.user._is_public():
+            return f'{name}:partner:{request.env.user.partner_id.id}'
+        return f'{name}:session:{hashlib.sha256(request.session.sid.encode()).hexdigest()}'
+
+    def _json_appointment_form_submit(self, **kwargs):
+        """ Process the appointment form submission, see ``json_appointment_form_submit``. """
 
         token = kwargs.get('cf-turnstile-response')
         remoteip = request.httprequest.headers.get('CF-Connecting-IP') or \
@@ -376,6 +687,17 @@ class HairByNingAppointmentController(AppointmentController):
 
         if not appointment_type:
             raise NotFound()
+
+        # Validate the answers before creating or updating any partner. The answer inputs will be
+        # created in _prepare_calendar_event_values from the values in answer_input_values
+        answer_input_values, answer_errors = appointment_type._parse_form_answers(kwargs)
+        if answer_errors:
+            return {
+                'status': 'error',
+                'message': 'Invalid answers',
+                'errors': answer_errors,
+            }
+
         timezone = request.session.get('timezone') or appointment_type.appointment_tz
         tz_session = pytz.timezone(timezone)
         datetime_str = unquote_plus(datetime_str)
@@ -393,7 +715,7 @@ class HairByNingAppointmentController(AppointmentController):
         asked_capacity = int(asked_capacity)
         resources_remaining_capacity = None
         if appointment_type.schedule_based_on == 'resources':
-            resource_ids = json.loads(unquote_plus('available_resource_ids', ''))
+            resource_ids = json.loads(unquote_plus(available_resource_ids or '[]'))
             # Check if there is still enough capacity (in case someone else booked with a resource in the meantime)
             resources = request.env['appointment.resource'].sudo().browse(resource_ids).exists()
             if any(resource not in appointment_type.resource_ids for resource in resources):
@@ -418,77 +740,34 @@ class HairByNingAppointmentController(AppointmentController):
 
         new_customer = not (customer.exists())
 
-        phone = customer._phone_format(number=phone, country=self._get_customer_country()) or phone
+        country = self._get_customer_country()
+        phone = customer._phone_format(number=phone, country=country) or phone
         if new_customer:
-            customer = request.env['res.partner'].sudo().search([
-                                ('name', '=', name),
-                                ('phone', '=', phone)
-                        ])
-            if not customer.exists():
+            # Match returning customers on their normalized phone and email, or on their phone and name without email
+            customer = request.env['res.partner'].sudo()._find_by_phone(phone, email, country, name=name)
+            if not customer:
                 customer = customer.create({
                     'name': name,
-                    'phone': customer._phone_format(number=phone, country=self._get_customer_country()) or phone,
+                    'phone': phone,
                     'email': email,
                     'lang': request.lang.code,
                 })
         else:
             if not customer.phone:
                 customer.write({
-                    'phone': customer._phone_format(number=phone, country=self._get_customer_country()) or phone 
+                    'phone': phone
                 })
 
-        # partner_inputs dictionary structures all answer inputs received on the appointment submission: key is question id, value
-        # is answer id (as string) for choice questions, text input for text questions, array of ids for multiple choice questions.
-        partner_inputs = {}
-        appointment_question_ids = appointment_type.question_ids.ids
-        for k_key, k_value in [item for item in kwargs.items() if item[1]]:
-            question_id_str = re.match(r"\bquestion_([0-9]+)\b", k_key)
-            if question_id_str and int(question_id_str.group(1)) in appointment_question_ids:
-                partner_inputs[int(question_id_str.group(1))] = k_value
-                continue
-            checkbox_ids_str = re.match(r"\bquestion_([0-9]+)_answer_([0-9]+)\b", k_key)
-            if checkbox_ids_str:
-                question_id, answer_id = [int(checkbox_ids_str.group(1)), int(checkbox_ids_str.group(2))]
-                if question_id in appointment_question_ids:
-                    partner_inputs[question_id] = partner_inputs.get(question_id, []) + [answer_id]
-
-        # The answer inputs will be created in _prepare_calendar_event_values from the values in answer_input_values
-        answer_input_values = []
-        base_answer_input_vals = {
-            'appointment_type_id': appointment_type.id,
-            'partner_id': customer.id,
-        }
-
-        for question in appointment_type.question_ids.filtered(lambda question: question.id in partner_inputs.keys()):
-            if question.question_type == 'checkbox':
-                answers = question.answer_ids.filtered(lambda answer: answer.id in partner_inputs[question.id])
-                answer_input_values.extend([
-                    dict(base_answer_input_vals, question_id=question.id, value_answer_id=answer.id) for answer in answers
-                ])
-            elif question.question_type in ['select', 'radio']:
-                answer_input_values.append(
-                    dict(base_answer_input_vals, question_id=question.id, value_answer_id=int(partner_inputs[question.id]))
-                )
-            elif question.question_type in ['char', 'text']:
-                answer_input_values.append(
-                    dict(base_answer_input_vals, question_id=question.id, value_text_box=partner_inputs[question.id].strip())
-                )
+        for values in answer_input_values:
+            values['partner_id'] = customer.id
 
         booking_line_values = []
+        resources_capacity = None
         if appointment_type.schedule_based_on == 'resources':
-            capacity_to_assign = asked_capacity
-            i = 0
-            for resource in resources:
-                resource_remaining_capacity =  appointment_type._get_resources_remaining_capacity(resources, date_start, date_end, with_linked_resources=False)
-                new_capacity_reserved = min(resource_remaining_capacity, capacity_to_assign, resource.capacity)
-                capacity_to_assign -= new_capacity_reserved
-                booking_line_values.append({
-                    'appointment_resource_id': resource.id,
-                    'capacity_reserved': new_capacity_reserved,
-                    'capacity_used': new_capacity_reserved if resource.shareable and appointment_type.resource_manage_capacity else resource.capacity,
-                    'product_variant_id': int(product_variant_id[i]),
-                })
-                i += 1
+            product_variant_ids = product_variant_id if isinstance(product_variant_id, list) else [product_variant_id]
+            booking_line_values, resources_capacity = self._allocate_resources_capacity(
+                appointment_type, resources, resources_remaining_capacity, asked_capacity, product_variant_ids
+            )
 
         if invite_token:
             appointment_invite = request.env['appointment.invite'].sudo().search([('access_token', '=', invite_token)])
@@ -497,32 +776,147 @@ class HairByNingAppointmentController(AppointmentController):
 
         return self._json_handle_appointment_form_submission(
             appointment_type, date_start, date_end, duration, answer_input_values, name,
-            customer, appointment_invite, guests, staff_user, asked_capacity, booking_line_values
+            customer, appointment_invite, guests, staff_user, asked_capacity, booking_line_values,
+            resources_capacity=resources_capacity, phone=phone,
         )
 
+    def _allocate_resources_capacity(self, appointment_type, resources, resources_remaining_capacity, asked_capacity, product_variant_ids):
+        """
+        Hand out the asked capacity and the chosen services over the resources, in a single
+        pass over one snapshot of the remaining capacity of the resources.
+
+        :param appointment_type: the appointment type booked
+        :param resources: the resources available for the slot
+        :param dict resources_remaining_capacity: snapshot returned by ``_get_resources_remaining_capacity``
+        :param int asked_capacity: the capacity asked by the customer
+        :param list product_variant_ids: the service chosen for each reserved place, in order
+        :return: a tuple (booking line values, per-resource breakdown) where the breakdown is
+            {resource id: {'remaining_capacity': int, 'capacity_reserved': int, 'capacity_used': int}}
+        """
+        booking_line_values = []
+        resources_capacity = {}
+        product_variant_ids = iter(product_variant_ids)
+        capacity_to_assign = asked_capacity
+        for resource in resources:
+            remaining_capacity = resources_remaining_capacity.get(resource, 0)
+            capacity_reserved = min(remaining_capacity, capacity_to_assign, resource.capacity)
+            capacity_used = capacity_reserved if resource.shareable and appointment_type.resource_manage_capacity else resource.capacity
+            resources_capacity[resource.id] = {
+                'remaining_capacity': remaining_capacity,
+                'capacity_reserved': capacity_reserved,
+                'capacity_used': capacity_used if capacity_reserved else 0,
+            }
+            if not capacity_reserved:
+                continue
+            capacity_to_assign -= capacity_reserved
+            booking_line_values.append({
+                'appointment_resource_id': resource.id,
+                'capacity_reserved': capacity_reserved,
+                'capacity_used': capacity_used,
+                'product_variant_id': int(next(product_variant_ids, 0)),
+            })
+        return booking_line_values, resources_capacity
+
     @http.route(['/hbn/appointment/payment/confirm/<int:partner_id>'],
                 type='json', auth="public", website=False)
-    def json_payment_confirm(self, partner_id):
+    def json_payment_confirm(self, partner_id, booking_id=None, invoice_id=None, reference=None, access_token=None):
         """
         Confirm appointment
 
-        :param partner_id: Customer id
-        """
-        event_id = request.env['calendar.event'].sudo().search([('partner_ids', 'in', partner_id)], order='create_date desc', limit=1)
+        A ``booking_id`` or an ``invoice_id`` is only trusted with the ``access_token`` of that
+        booking or of one of its invoices; without any reference, the most recent booking of the
+        customer is confirmed.
 
-        try:
-        
-            if event_id.appointment_status == 'request':
-                event_id.action_make_deposit()
+        :param partner_id: Customer id, used to find the booking when no other reference is given
+        :param booking_id: Booking reference
+        :param invoice_id: Invoice paid
+        :param reference: Payment transaction reference
+        :param access_token: Access token of the booking or of the invoice
+        """
+        confirmation = self._get_payment_confirmation({
+            'booking_id': booking_id,
+            'invoice_id': invoice_id,
+            'reference': reference,
+            'access_token': access_token,
+        })
+        if confirmation is None:
+            if booking_id or invoice_id:
+                raise BadRequest("booking_id and invoice_id need an access_token")
+            confirmation = {'partner_id': partner_id}
+        self._confirm_payments([confirmation])
+        return Response("OK", status=200, mimetype='text/plain')
 
-            if event_id.appointment_status == 'attended':
-                attendee = request.env['calendar.attendee'].sudo().search([('event_id', '=', event_id.id)])
-                attendee.send_booking_checkout_confirmation() #type: ignore
+    @http.route(['/hbn/appointment/payment/confirm'],
+                type='json', auth="public", website=False)
+    def json_payment_confirm_batch(self, confirmations):
+        """
+        Confirm the appointments of a batch of payments, e.g. the reconciliation of the provider.
 
-        except requests.RequestException as e:
-            _logger.error("json_payment_confirm: Error confirming payment: %s", str(e))
+        Each confirmation must prove it comes from the payment of the booking: either with the
+        ``reference`` of its payment transaction, or with a ``booking_id`` or an ``invoice_id``
+        and the ``access_token`` of that booking or of one of its invoices.
 
-        return Response("OK", status=200, mimetype='text/plain')
+        :param confirmations: list of dicts with either the key reference, or the keys
+            access_token and booking_id or invoice_id
+        :return: {'results': [{'event_id': int or False, 'status': str}, ...]}, aligned with
+            ``confirmations``; status is one of 'not_found', 'deposit', 'checkout', 'ignored'
+        """
+        if not isinstance(confirmations, list) or not all(isinstance(item, dict) for item in confirmations):
+            raise BadRequest("confirmations must be a list of objects")
+        items = [self._get_payment_confirmation(item) for item in confirmations]
+        if None in items:
+            raise BadRequest("each confirmation needs a reference, or an access_token with a booking_id or an invoice_id")
+        return {'results': self._confirm_payments(items)}
+
+    def _get_payment_confirmation(self, values):
+        """ Return the confirmation to look up for the payment ``values``: the booking or the
+            invoice with the access token proving it, or else the payment transaction reference.
+
+            :return: dict, or None when ``values`` carry no proof of payment
+        """
+        keys = ('booking_id', 'invoice_id', 'reference', 'access_token')
+        values = {key: values[key] for key in keys if isinstance(values.get(key), (str, int)) and values[key]}
+        if values.get('access_token') and (values.get('booking_id') or values.get('invoice_id')):
+            return {key: values.get(key) for key in ('booking_id', 'invoice_id', 'access_token')}
+        if values.get('reference'):
+            return {'reference': values['reference']}
+        return None
+
+    def _confirm_payments(self, confirmations):
+        Event = request.env['calendar.event'].sudo()
+        events = [
+            event if self._check_payment_access_token(event, confirmation) else Event
+            for event, confirmation in zip(Event._find_by_payment_references(confirmations), confirmations)
+        ]
+        to_deposit, attended = Event.union(*events)._confirm_payment()
+
+        results = []
+        for event in events:
+            if not event:
+                status = 'not_found'
+            elif event in to_deposit:
+                status = 'deposit'
+            elif event in attended:
+                status = 'checkout'
+            else:
+                status = 'ignored'
+            results.append({'event_id': event.id, 'status': status})
+        return results
+
+    def _check_payment_access_token(self, event, confirmation):
+        """ Return whether ``event`` may be confirmed by ``confirmation``: a booking or an invoice
+            is only trusted with the access token of ``event`` or of one of its invoices, other
+            keys (payment transaction reference, legacy customer id) prove the payment themselves.
+        """
+        if not event:
+            return True
+        if not (confirmation.get('booking_id') or confirmation.get('invoice_id')):
+            return True
+        access_token = confirmation.get('access_token')
+        if not access_token:
+            return False
+        tokens = [event.access_token] + event.sale_order_id.invoice_ids.mapped('access_token')
+        return any(token and consteq(token, str(access_token)) for token in tokens)
 
     @http.route(['/hbn/appointment/confirm/<int:event_id>'],
                 type='http', auth="public", website=False)
@@ -548,6 +942,27 @@ class HairByNingAppointmentController(AppointmentController):
             </script>
         """
 
+    @http.route(['/hbn/appointment/deposit/status/<int:event_id>'],
+                type='json', auth="user", website=False)
+    def appointment_deposit_status(self, event_id):
+        """
+        Status of the deposit of a booking, polled by the UI after ``action_make_deposit``.
+
+        :param event_id: Calendar event
+        """
+        event = request.env['calendar.event'].browse(event_id).exists()
+        if not event:
+            raise NotFound()
+        event.check_access('read')
+        job = request.env['hbn.deposit.job'].sudo().search([('event_id', '=', event.id)], order='id desc', limit=1)
+        if not job:
+            return {
+                'state': 'done' if event.sale_order_id else False,
+                'appointment_status': event.appointment_status,
+                'sale_order_id': event.sale_order_id.id,
+            }
+        return job._get_status()
+
     @http.route(['/hbn/appointment/checkout/confirm/<int:event_id>'],
                 type='http', auth="public", website=False)
     def appointment_checkout_confirm(self, event_id, **kwargs):
@@ -557,7 +972,7 @@ class HairByNingAppointmentController(AppointmentController):
         :param event_id: Calendar event
         """
         attendee = request.env['calendar.attendee'].sudo().search([('event_id', '=', event_id)])
-        attendee.send_booking_checkout_confirmation() #type: ignore
+        request.env['hbn.outbox.message'].sudo()._enqueue('checkout_confirmation', attendee)
 
         # 2. Return an HTML script back to the hidden frame.
         # 'window.parent' targets the main Odoo window.
@@ -574,12 +989,19 @@ class HairByNingAppointmentController(AppointmentController):
         self, appointment_type,
         date_start, date_end, duration,  # appointment boundaries
         answer_input_values, name, customer, appointment_invite, guests=None,  # customer info
-        staff_user=None, asked_capacity=1, booking_line_values=None  # appointment staff / resources
+        staff_user=None, asked_capacity=1, booking_line_values=None,  # appointment staff / resources
+        resources_capacity=None, phone=None,
     ):
         """ This method takes the output of the processing of appointment's form submission and
             creates the event corresponding to those values. Meant for overrides to set values
             needed to set a specific redirection._id
 
+            :param list booking_line_values: booking lines computed by ``_allocate_resources_capacity``,
+              created as is with the booking instead of being allocated again
+            :param dict resources_capacity: per-resource breakdown computed by ``_allocate_resources_capacity``,
+              reused as is instead of reading the capacity back from the created booking lines
+            :param str phone: phone submitted by the visitor, sent back instead of the one of the
+              matched partner
             :returns: a dict of useful values used in the redirection to next step
         """
         event = request.env['calendar.event'].with_context(
@@ -587,6 +1009,8 @@ class HairByNingAppointmentController(AppointmentController):
             mail_create_nolog=True,
             mail_create_nosubscribe=True,
             allowed_company_ids=self._get_allowed_companies(staff_user or appointment_type.create_uid).ids,
+            # keep the booking lines allocated by ``_allocate_resources_capacity``
+            hbn_booking_lines_allocated=bool(booking_line_values),
         ).sudo().create({
             'appointment_answer_input_ids': [Command.create(vals) for vals in answer_input_values],
             **appointment_type._prepare_calendar_event_values(
@@ -600,14 +1024,17 @@ class HairByNingAppointmentController(AppointmentController):
             'deposit_amount': event.deposit_amount,
             'service_name': event.name,
             'location': event.location,
-            'guest_name': event.partner_ids.name,
-            'phone': event.partner_ids.phone,
+            'guest_name': name,
+            'phone': phone,
             'date': event.start_date,
             'start_datetime': event.start.astimezone(timezone),
             'stop_datetime': event.stop.astimezone(timezone),
             'guest_count': event.resource_total_capacity_reserved,
             'booking_id': event.booking_id
         }
+        if resources_capacity is not None:
+            data['guest_count'] = sum(capacity['capacity_reserved'] for capacity in resources_capacity.values())
+            data['resources_capacity'] = resources_capacity
 
         return {
             'status': 200,
@@ -621,20 +1048,4 @@ class HairByNingAppointmentController(AppointmentController):
         else:
             secret = '1x0000000000000000000000000000000AA'
 
-        url = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
-
-        data = {
-            'secret': secret,
-            'response': token
-        }
-
-        if remoteip:
-            data['remoteip'] = remoteip
-
-        try:
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Turnstile validation error: {e}")
-            return {'success': False, 'error-codes': ['internal-error']}
\ No newline at end of file
+        return _get_turnstile_client().verify(secret, token, remoteip)
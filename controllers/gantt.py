@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import timedelta
+
+from odoo import fields, http
+from odoo.http import request
+from werkzeug.exceptions import BadRequest
+
+from ..tools import parse_time_of_day
+
+# Widest range served at once, the month scale of the Gantt with some margin
+GANTT_SCHEDULE_MAX_RANGE = timedelta(days=93)
+# Largest id of a record (PostgreSQL integer)
+MAX_RECORD_ID = 2 ** 31 - 1
+
+
+def _is_record_id(value):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value <= MAX_RECORD_ID
+
+
+class HbnGanttController(http.Controller):
+
+    @http.route(['/hbn/appointment/gantt/schedule'], type='json', auth="user")
+    def gantt_schedule(self, start, stop, resource_ids=None, appointment_type_id=None, timezone=None,
+                       slot_min_time=None, slot_max_time=None):
+        """
+        Bookings and occupancy of a group of chairs, for the chair Gantt (see
+        ``calendar.event._get_gantt_schedule``).
+
+        :param start: start of the range, UTC datetime string
+        :param stop: end of the range, UTC datetime string
+        :param resource_ids: chairs to return, defaults to the chairs of the appointment type
+        :param appointment_type_id: appointment type whose chairs are returned
+        :param timezone: timezone of the opening hours, defaults to the timezone of the user
+        :param slot_min_time: opening time, HH:MM
+        :param slot_max_time: closing time, HH:MM
+        """
+        try:
+            start, stop = fields.Datetime.to_datetime(start), fields.Datetime.to_datetime(stop)
+            open_time = parse_time_of_day(slot_min_time) if slot_min_time else None
+            close_time = parse_time_of_day(slot_max_time) if slot_max_time else None
+        except (TypeError, ValueError) as e:
+            raise BadRequest(str(e))
+        if not start or not stop or stop <= start or stop - start > GANTT_SCHEDULE_MAX_RANGE:
+            raise BadRequest("Invalid range")
+        if resource_ids is not None and not (
+            isinstance(resource_ids, list) and all(_is_record_id(resource_id) for resource_id in resource_ids)
+        ):
+            raise BadRequest("resource_ids must be a list of ids")
+        if appointment_type_id is not None and not _is_record_id(appointment_type_id):
+            raise BadRequest("appointment_type_id must be an id")
+
+        if resource_ids:
+            resources = request.env['appointment.resource'].browse(resource_ids).exists()
+        elif appointment_type_id:
+            resources = request.env['appointment.type'].browse(appointment_type_id).exists().resource_ids
+        else:
+            raise BadRequest("resource_ids or appointment_type_id is required")
+        resources.check_access('read')
+
+        schedule = request.env['calendar.event']._get_gantt_schedule(
+            start, stop, resources,
+            timezone=timezone or request.env.user.tz or 'UTC',
+            open_time=open_time,
+            close_time=close_time,
+        )
+        return dict(schedule, start=fields.Datetime.to_string(start), stop=fields.Datetime.to_string(stop))
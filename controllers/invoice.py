@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import http
+from odoo.http import request, content_disposition
+from werkzeug.exceptions import BadRequest, NotFound
+
+# Most invoices rendered by one request, wkhtmltopdf holds the whole batch in memory
+PROFORMA_MAX_INVOICES = 200
+# Largest id of a record (PostgreSQL integer)
+MAX_RECORD_ID = 2 ** 31 - 1
+
+
+class HbnInvoiceController(http.Controller):
+
+    @http.route(['/hbn/invoice/proforma'], type='http', auth="user", methods=['GET'])
+    def invoice_proforma(self, invoice_ids='', **kwargs):
+        """
+        Proformas of several invoices, rendered in one pass, in a zip archive.
+
+        :param invoice_ids: comma-separated ids of the invoices
+        """
+        ids = [invoice_id.strip() for invoice_id in invoice_ids.split(',') if invoice_id.strip()]
+        if not all(invoice_id.isdecimal() for invoice_id in ids):
+            raise BadRequest("invoice_ids must be comma-separated ids")
+        invoices = self._get_proforma_invoices([int(invoice_id) for invoice_id in ids])
+        content = invoices._get_invoices_pdf_proforma_zip()
+        return request.make_response(content, headers=[
+            ('Content-Type', 'application/zip'),
+            ('Content-Length', len(content)),
+            ('Content-Disposition', content_disposition('proformas.zip')),
+        ])
+
+    @http.route(['/hbn/invoice/proforma/attach'], type='json', auth="user")
+    def invoice_proforma_attach(self, invoice_ids):
+        """
+        Proformas of several invoices, rendered in one pass and stored as attachments of the invoices.
+
+        :param invoice_ids: list of invoice ids
+        :return: {'attachment_ids': [int]}
+        """
+        if not isinstance(invoice_ids, list) or not all(
+            isinstance(invoice_id, int) and not isinstance(invoice_id, bool) for invoice_id in invoice_ids
+        ):
+            raise BadRequest("invoice_ids must be a list of ids")
+        invoices = self._get_proforma_invoices(invoice_ids)
+        return {'attachment_ids': invoices._attach_invoices_pdf_proforma().ids}
+
+    def _get_proforma_invoices(self, ids):
+        if not ids or len(ids) > PROFORMA_MAX_INVOICES:
+            raise BadRequest(f"between 1 and {PROFORMA_MAX_INVOICES} invoices are expected")
+        if not all(0 < invoice_id <= MAX_RECORD_ID for invoice_id in ids):
+            raise BadRequest("invoice_ids must be ids of invoices")
+        invoices = request.env['account.move'].browse(ids).exists()
+        if not invoices:
+            raise NotFound()
+        invoices.check_access('read')
+        return invoices
@@ -22,6 +22,7 @@ import requests
 import jwt
 import os
 import base64
+import time
 
 _logger = logging.getLogger(__name__)
 
@@ -37,11 +38,14 @@ class HBNOAuthController(OAuthController):
         ensure_db(db=dbname)
         request.update_context(**clean_context(state.get('c', {})))
         _logger.debug("OAuthController: start")
+        start = time.perf_counter()
 
         try:
 
             _, login, key = request.env['res.users'].with_user(SUPERUSER_ID).auth_oauth(provider, kw) #type: ignore
+            validated = time.perf_counter()
             request.env.cr.commit()
+            committed = time.perf_counter()
 
             action = state.get('a')
             menu = state.get('m')
@@ -56,6 +60,11 @@ class HBNOAuthController(OAuthController):
 
             credential = {'login': login, 'password': key, 'type': 'password'}
             auth_info = request.session.authenticate(dbname, credential)
+            authenticated = time.perf_counter()
+            _logger.info(
+                "OAuth2 sign-in: validation %.3fs, commit %.3fs, authentication %.3fs, total %.3fs",
+                validated - start, committed - validated, authenticated - committed, authenticated - start,
+            )
 
             return {
                 'auth_info': auth_info
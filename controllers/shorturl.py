@@ -1,22 +1,43 @@
+import re
+
 from odoo import http
 from odoo.http import request
 from werkzeug.exceptions import NotFound
 
+SHORT_LINK_CODE_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
 class InvoiceShortenerController(http.Controller):
 
     # auth="public" opens the route to the world without requiring a standard login screen first
+    @http.route('/l/<string:code>', type='http', auth='public')
+    def follow_short_link(self, code, **kw):
+        if not SHORT_LINK_CODE_RE.match(code):
+            return NotFound()
+        link = request.env['hbn.short.link'].sudo()._resolve(code=code)
+        if not link:
+            return NotFound()
+        return self._follow_link(link)
+
+    # Links sent before the short links, resolved through the latest short link of the invoice
     @http.route('/inv/<int:invoice_id>', type='http', auth='public')
     def redirect_to_secure_invoice(self, invoice_id, **kw):
-        # 1. Fetch the invoice record securely using sudo() to bypass standard access rights
-        invoice = request.env['account.move'].sudo().browse(invoice_id)
-        
-        if invoice.exists() and invoice.move_type == 'out_invoice':
-            # 2. Retrieve Odoo's native secure portal share URL (which includes the access token)
-            secure_portal_url = invoice.get_portal_url()
-            download_url = f"{secure_portal_url}&report_type=pdf&download=true"
+        link = request.env['hbn.short.link'].sudo()._resolve(invoice_id=invoice_id)
+        if link:
+            return self._follow_link(link)
+
+        # Invoices shared before the short links: redirect to their portal URL, without creating
+        # an access token on a GET request; invoices without one are shown to their logged in customer
+        invoice = request.env['account.move'].sudo().browse(invoice_id).exists()
+        if invoice.move_type != 'out_invoice':
+            return NotFound()
+        if invoice.access_token:
+            return request.redirect(f"{invoice.get_portal_url()}&report_type=pdf&download=true")
+        return request.redirect(invoice.access_url)
 
-            # 3. Securely redirect the browser straight to the layout screen
-            return request.redirect(download_url)
-        
-        # Fallback if the invoice doesn't exist
-        return NotFound()
\ No newline at end of file
+    def _follow_link(self, link):
+        # Serve the invoice PDF rendered in the background, with ETag and Range support
+        if link.invoice_id:
+            attachment = link.invoice_id._get_invoice_pdf_cache()
+            if attachment:
+                return request.env['ir.binary']._get_stream_from(attachment).get_response(as_attachment=True)
+        return request.redirect(link.target_url, local=False)
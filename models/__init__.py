@@ -2,6 +2,19 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from . import ir_ui_view
+from . import appointment_slot_version
+from . import appointment_type
+from . import appointment_question
 from . import calendar_event
+from . import deposit_tier
+from . import deposit_job
+from . import idempotency_key
+from . import outbox_message
+from . import short_link
 from . import appointment_booking_line
 from . import account_move
+from . import payment_transaction
+from . import product_product
+from . import res_partner
+from . import res_users
+from . import auth_oauth_provider
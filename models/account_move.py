@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import io
 import logging
+import os
+import threading
+import zipfile
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.modules.registry import Registry
 from odoo import api, fields, models, _, SUPERUSER_ID
@@ -10,6 +16,17 @@ from odoo import _
 
 _logger = logging.getLogger(__name__)
 
+# Fields that can be written on an invoice without changing its PDF
+INVOICE_PDF_NEUTRAL_FIELDS = {
+    'invoice_pdf_cache_id', 'invoice_pdf_cache_stale', 'invoice_pdf_render_attempts',
+    'invoice_pdf_render_error', 'invoice_pdf_next_render_date', 'access_token',
+    'message_main_attachment_id', 'is_move_sent', 'calendar_event_id',
+}
+# Renderings of the PDF of an invoice tried before giving up, until the invoice changes again
+INVOICE_PDF_MAX_ATTEMPTS = 5
+# Delay before rendering again a PDF that failed, doubled at each attempt
+INVOICE_PDF_RETRY_DELAY = timedelta(minutes=10)
+
 class AccountMove(models.Model):
     color = fields.Integer(
         string='Color Index',
@@ -18,19 +35,159 @@ class AccountMove(models.Model):
 
     _inherit = ['account.move']
 
+    calendar_event_id = fields.Many2one(
+        'calendar.event',
+        string="Booking",
+        compute='_compute_calendar_event_id',
+        store=True,
+        index='btree_not_null',
+        readonly=True,
+    )
+
+    invoice_pdf_cache_id = fields.Many2one(
+        'ir.attachment',
+        string="Pre-rendered PDF",
+        copy=False,
+        readonly=True,
+        ondelete='set null',
+    )
+    invoice_pdf_cache_stale = fields.Boolean(
+        string="PDF To Render",
+        copy=False,
+        readonly=True,
+        index=True,
+        help="The invoice changed since its PDF was rendered, it is rendered again in the background.",
+    )
+    invoice_pdf_render_attempts = fields.Integer(string="PDF Rendering Attempts", copy=False, readonly=True)
+    invoice_pdf_render_error = fields.Text(string="PDF Rendering Error", copy=False, readonly=True)
+    invoice_pdf_next_render_date = fields.Datetime(string="Next PDF Rendering", copy=False, readonly=True)
+
+    def write(self, vals):
+        res = super().write(vals)
+        if not INVOICE_PDF_NEUTRAL_FIELDS.issuperset(vals):
+            self._invalidate_invoice_pdf()
+        return res
+
+    def _invalidate_invoice_pdf(self):
+        """ Queue the rendering of the PDF of the posted customer invoices. The invoices whose
+            rendering failed get a fresh set of attempts.
+        """
+        invoices = self.filtered(
+            lambda move: move.move_type == 'out_invoice' and move.state == 'posted'
+            and (not move.invoice_pdf_cache_stale or move.invoice_pdf_render_attempts)
+        )
+        if invoices:
+            invoices.sudo().write({
+                'invoice_pdf_cache_stale': True,
+                'invoice_pdf_render_attempts': 0,
+                'invoice_pdf_render_error': False,
+                'invoice_pdf_next_render_date': False,
+            })
+            self.env.ref('hair_by_ning.ir_cron_hbn_invoice_pdf')._trigger()
+
+    def _get_invoice_pdf_cache(self):
+        """ Return the pre-rendered PDF of the invoice, or no attachment when it is not up to date. """
+        self.ensure_one()
+        if self.invoice_pdf_cache_stale:
+            return self.env['ir.attachment']
+        return self.invoice_pdf_cache_id
+
+    @api.model
+    def _cron_render_invoice_pdfs(self, batch_size=20):
+        """ Render the PDF of the invoices that changed, a batch at a time in one report rendering.
+
+            When the batch fails, its invoices are rendered one by one; the ones that fail again
+            are retried later with an exponential backoff, and left aside after
+            ``INVOICE_PDF_MAX_ATTEMPTS`` attempts so that they do not hold the queue up.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        now = fields.Datetime.now()
+        invoices = self.search([
+            ('invoice_pdf_cache_stale', '=', True),
+            ('invoice_pdf_render_attempts', '<', INVOICE_PDF_MAX_ATTEMPTS),
+            '|', ('invoice_pdf_next_render_date', '=', False), ('invoice_pdf_next_render_date', '<=', now),
+        ], order='invoice_pdf_render_attempts, write_date, id', limit=batch_size)
+        try:
+            with self.env.cr.savepoint():
+                invoices._render_invoice_pdf_cache()
+        except Exception:
+            _logger.exception("Invoice PDFs: rendering of %s failed, rendering them one by one", invoices.ids)
+            self.env.invalidate_all()
+            for invoice in invoices:
+                try:
+                    with self.env.cr.savepoint():
+                        invoice._render_invoice_pdf_cache()
+                except Exception as e:
+                    _logger.exception("Invoice PDFs: rendering of invoice %s failed", invoice.id)
+                    self.env.invalidate_all()
+                    invoice._retry_invoice_pdf_later(str(e))
+        if auto_commit:
+            self.env.cr.commit()
+        if len(invoices) == batch_size:
+            self.env.ref('hair_by_ning.ir_cron_hbn_invoice_pdf')._trigger()
+
+    def _retry_invoice_pdf_later(self, error):
+        self.ensure_one()
+        attempts = self.invoice_pdf_render_attempts + 1
+        self.write({
+            'invoice_pdf_render_attempts': attempts,
+            'invoice_pdf_render_error': error,
+            'invoice_pdf_next_render_date': fields.Datetime.now() + INVOICE_PDF_RETRY_DELAY * 2 ** (attempts - 1),
+        })
+        if attempts >= INVOICE_PDF_MAX_ATTEMPTS:
+            _logger.warning("Invoice PDFs: giving up rendering invoice %s after %s attempts", self.id, attempts)
+
+    def _render_invoice_pdf_cache(self):
+        """ Render the PDFs of the invoices in one pass and store them as attachments. """
+        if not self:
+            return
+        content_by_id = self._render_invoice_pdfs()
+        for invoice in self:
+            values = {
+                'name': f"{(invoice.name or 'INV').replace('/', '_')}.pdf",
+                'raw': content_by_id[invoice.id],
+                'mimetype': 'application/pdf',
+            }
+            if invoice.invoice_pdf_cache_id:
+                invoice.invoice_pdf_cache_id.write(values)
+            else:
+                invoice.invoice_pdf_cache_id = self.env['ir.attachment'].create(dict(
+                    values, res_model=invoice._name, res_id=invoice.id,
+                ))
+        self.write({
+            'invoice_pdf_cache_stale': False,
+            'invoice_pdf_render_attempts': 0,
+            'invoice_pdf_render_error': False,
+            'invoice_pdf_next_render_date': False,
+        })
+
     def _invoice_paid_hook(self):
         # OVERRIDE
         res = super()._invoice_paid_hook()
-        for move in self:
-            for line in move.invoice_line_ids:
-                if not line.is_downpayment:
-                    for sale_line in line.sale_line_ids:
-                        if sale_line.amount_to_invoice == 0.0: 
-                            event_id = self.env['calendar.event'].sudo().search([('sale_order_id', '=', sale_line.order_id.id)])
-                            event_id.write({'appointment_status': 'attended'})
-                            self._send_conversion_event(event_id)
+        self._invalidate_invoice_pdf()  # the PDF shows the payment status
+        # Bookings whose order is fully invoiced are attended: one search and one write for the whole batch
+        sale_lines = self.invoice_line_ids.filtered(lambda line: not line.is_downpayment).sale_line_ids
+        orders = sale_lines.filtered(lambda sale_line: sale_line.amount_to_invoice == 0.0).order_id
+        if orders:
+            events = self.env['calendar.event'].sudo().search([('sale_order_id', 'in', orders.ids)])
+            if events:
+                events.write({'appointment_status': 'attended'})
+                self._send_conversion_event(events)
         return res
 
+    @api.depends('line_ids.sale_line_ids.order_id')
+    def _compute_calendar_event_id(self):
+        orders = self.line_ids.sale_line_ids.order_id
+        event_by_order = {
+            event.sale_order_id: event
+            for event in self.env['calendar.event'].sudo().search([('sale_order_id', 'in', orders.ids)])
+        } if orders else {}
+        for move in self:
+            move.calendar_event_id = next(
+                (event_by_order[order] for order in move.line_ids.sale_line_ids.order_id if order in event_by_order),
+                False,
+            )
+
     @api.depends('name')
     def _compute_color(self):
         for record in self:
@@ -50,9 +207,20 @@ class AccountMove(models.Model):
 
     @api.model
     def _send_conversion_event(self, event_id):
+        """ Queue the conversion events of the attendees of ``event_id`` (one or more bookings),
+            once per attendee; they are sent in batches by the outbox.
+        """
+        attendees = self.env['calendar.attendee'].search([('event_id', 'in', event_id.ids)])
+        self.env['hbn.outbox.message'].sudo()._enqueue('conversion', attendees)
+
+    def _render_invoice_pdfs(self):
+        """ Render the invoices in a single report rendering and split the result.
 
-        attendee = self.env['calendar.attendee'].search([('event_id', '=', event_id.id)])
-        attendee.send_conversion_api_event() #type: ignore
+            :return: {invoice id: PDF content}
+        """
+        ActionReport = self.env['ir.actions.report']
+        content, report_type = ActionReport._pre_render_qweb_pdf('account.account_invoices', self.ids, data={'proforma': False})
+        return ActionReport._get_splitted_report('account.account_invoices', content, report_type)
 
     def _get_invoice_pdf_proforma(self):
         """ Generate the Proforma of the invoice.
@@ -60,11 +228,40 @@ class AccountMove(models.Model):
         {'filename': 'INV_2024_0001_proforma.pdf', 'filetype': 'pdf', 'content': ...}
         """
         self.ensure_one()
-        filename = self._get_invoice_proforma_pdf_report_filename()
-        content, report_type = self.env['ir.actions.report']._pre_render_qweb_pdf('account.account_invoices', self.ids, data={'proforma': False})
-        content_by_id = self.env['ir.actions.report']._get_splitted_report('account.account_invoices', content, report_type)
+        return self._get_invoices_pdf_proforma()[self.id]
+
+    def _get_invoices_pdf_proforma(self):
+        """ Generate the Proformas of the invoices, all rendered at once.
+        :return dict: {invoice id: Proforma's data (see _get_invoice_pdf_proforma)}
+        """
+        content_by_id = self._render_invoice_pdfs() if self else {}
         return {
-            'filename': filename,
-            'filetype': 'pdf',
-            'content': content_by_id[self.id],
+            invoice.id: {
+                'filename': invoice._get_invoice_proforma_pdf_report_filename(),
+                'filetype': 'pdf',
+                'content': content_by_id[invoice.id],
+            }
+            for invoice in self
         }
+
+    def _get_invoices_pdf_proforma_zip(self):
+        """ Return the Proformas of the invoices in a zip archive. The files are suffixed with
+            the id of their invoice, draft invoices all being named ``/``.
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for invoice_id, proforma in self._get_invoices_pdf_proforma().items():
+                stem, extension = os.path.splitext(proforma['filename'])
+                archive.writestr(f"{stem}-{invoice_id}{extension}", proforma['content'])
+        return buffer.getvalue()
+
+    def _attach_invoices_pdf_proforma(self):
+        """ Store the Proformas of the invoices as attachments of the invoices. """
+        proformas = self._get_invoices_pdf_proforma()
+        return self.env['ir.attachment'].create([{
+            'name': proformas[invoice.id]['filename'],
+            'raw': proformas[invoice.id]['content'],
+            'mimetype': 'application/pdf',
+            'res_model': invoice._name,
+            'res_id': invoice.id,
+        } for invoice in self])
@@ -13,3 +13,30 @@ class AppointmentBookingLine(models.Model):
         ondelete="cascade", 
         required=True
     )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._invalidate_slots()
+        return lines
+
+    def write(self, vals):
+        impacts_slots = set(vals) - {'product_variant_id'}
+        if impacts_slots:
+            self._invalidate_slots()
+        res = super().write(vals)
+        if impacts_slots:
+            self._invalidate_slots()
+        return res
+
+    def unlink(self):
+        self._invalidate_slots()
+        return super().unlink()
+
+    def _invalidate_slots(self):
+        """ Invalidate the cached appointment slots of the resources booked by these lines. """
+        self.env['appointment.type']._invalidate_slots([
+            (line.appointment_resource_id.appointment_type_ids | line.calendar_event_id.appointment_type_id,
+             line.calendar_event_id.start, line.calendar_event_id.stop)
+            for line in self.sudo()
+        ])
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+
+class AppointmentQuestion(models.Model):
+    _inherit = "appointment.question"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().unlink()
+
+
+class AppointmentAnswer(models.Model):
+    _inherit = "appointment.answer"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().write(vals)
+
+    def unlink(self):
+        self.env.registry.clear_cache()  # appointment.type._get_form_schema
+        return super().unlink()
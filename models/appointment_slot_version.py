@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import fields, models
+
+
+class AppointmentSlotVersion(models.Model):
+    """ Availability counter of an appointment type for a given month.
+
+        Every booking change bumps the counters of the months it overlaps. The cached
+        slots of a reference month stay valid as long as the sum of the counters of
+        that month and of every later month did not move.
+    """
+    _name = "hbn.slot.version"
+    _description = "Appointment Slot Availability Version"
+    _log_access = False
+
+    appointment_type_id = fields.Many2one('appointment.type', required=True, ondelete='cascade', index=True)
+    month = fields.Date(required=True)
+    version = fields.Integer(default=0, required=True)
+
+    _sql_constraints = [
+        ('appointment_type_month_uniq', 'unique(appointment_type_id, month)',
+         'Only one availability version per appointment type and month.'),
+    ]
+
+    def _bump(self, months_by_type):
+        """ Increment the counters of the given months.
+
+            :param dict months_by_type: {appointment_type_id: set of first-of-month dates}
+        """
+        # sorted so that concurrent transactions lock the rows in the same order
+        rows = sorted(
+            (type_id, month)
+            for type_id, months in months_by_type.items()
+            for month in months
+        )
+        if not rows:
+            return
+        self.env.cr.execute("""
+            INSERT INTO hbn_slot_version (appointment_type_id, month, version)
+                 SELECT type_id, month, 1
+                   FROM unnest(%s::int[], %s::date[]) AS t(type_id, month)
+            ON CONFLICT (appointment_type_id, month)
+              DO UPDATE SET version = hbn_slot_version.version + 1
+        """, ([row[0] for row in rows], [row[1] for row in rows]))
+
+    def _get_stamp(self, appointment_type_id, month):
+        """ Return the availability stamp of the slots computed from ``month`` onwards. """
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(version), 0)
+              FROM hbn_slot_version
+             WHERE appointment_type_id = %s
+               AND month >= %s
+        """, (appointment_type_id, month))
+        return self.env.cr.fetchone()[0]
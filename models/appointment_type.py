@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+
+from odoo import api, fields, models, tools
+
+from ..tools import SharedCache
+
+# Slots also depend on the current time (minimum scheduling delay, past slots):
+# neither a cached entry nor an availability version lives longer than this many seconds
+SLOTS_VERSION_LIFETIME = 300
+# {(dbname, appointment_type_id, reference_date, filters, asked_capacity, timezone, lang, version): slots}
+SLOTS_CACHE = SharedCache(maxsize=512, ttl=SLOTS_VERSION_LIFETIME)
+# Fields of appointment.type changing the slots of every month
+SLOTS_FIELDS = {
+    'active', 'appointment_duration', 'appointment_tz', 'category', 'max_schedule_days',
+    'min_schedule_hours', 'resource_ids', 'resource_manage_capacity', 'schedule_based_on',
+    'slot_ids', 'staff_user_ids',
+}
+
+
+def _catalogue_domain_key(domain):
+    """ Return a hashable key of a catalogue domain. Datetimes are truncated to the hour,
+        so that domains comparing with "now" share the same catalogue for an hour.
+    """
+    def leaf_key(leaf):
+        if isinstance(leaf, (list, tuple)):
+            return tuple(leaf_key(item) for item in leaf)
+        if isinstance(leaf, datetime):
+            return leaf.replace(minute=0, second=0, microsecond=0).isoformat()
+        return leaf
+    return repr(leaf_key(domain))
+
+
+def _months_between(start, stop):
+    """ Yield the first day of every month overlapped by [start, stop]. """
+    month = start.replace(day=1)
+    while month <= stop:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+class AppointmentType(models.Model):
+    _inherit = "appointment.type"
+
+    def write(self, vals):
+        res = super().write(vals)
+        if SLOTS_FIELDS.intersection(vals):
+            now = fields.Datetime.now()
+            self._invalidate_slots([
+                (appointment_type, now, now + timedelta(days=appointment_type.max_schedule_days or 0))
+                for appointment_type in self
+            ])
+        return res
+
+    def _slots_generate(self, first_day, last_day, timezone, reference_date=None):
+        # ``hbn_slots_until``: naive UTC datetime capping the generated slots, so that the slots
+        # of one month are computed without the rest of the booking horizon
+        until = self.env.context.get('hbn_slots_until')
+        if until:
+            last_day = min(last_day, pytz.utc.localize(until).astimezone(last_day.tzinfo))
+        return super()._slots_generate(first_day, last_day, timezone, reference_date=reference_date)
+
+    @api.model
+    def _get_booking_catalogue(self, lang, domain):
+        """ Return the bookable appointment types matching ``domain``, grouped by location:
+            {location: [{'id': int, 'name': str, 'max_capacity': int}, ...]}
+
+            The catalogue is cached per language and domain until an appointment type or
+            a resource changes. The returned value is shared, it must not be modified.
+        """
+        return self._get_booking_catalogue_cached(lang, _catalogue_domain_key(domain), self._get_catalogue_version(), domain)
+
+    @api.model
+    def _get_catalogue_version(self):
+        """ Return a stamp of the appointment types and resources, changing whenever one of
+            them is created, modified or deleted.
+        """
+        self.env.cr.execute("""
+            SELECT (SELECT ROW(MAX(write_date), COUNT(*))::text FROM appointment_type),
+                   (SELECT ROW(MAX(write_date), COUNT(*))::text FROM appointment_resource)
+        """)
+        return self.env.cr.fetchone()
+
+    @api.model
+    @tools.ormcache('lang', 'domain_key', 'version')
+    def _get_booking_catalogue_cached(self, lang, domain_key, version, domain):
+        appointment_types = self.sudo().with_context(lang=lang).search(domain)
+        catalogue = defaultdict(list)
+        for values in appointment_types.read(['name', 'location', 'resource_count']):
+            catalogue[values['location']].append({
+                'id': values['id'],
+                'name': values['name'],
+                'max_capacity': values['resource_count'],
+            })
+        return dict(catalogue)
+
+    def _get_form_schema(self):
+        """ Return the compiled form schema of the appointment type:
+
+            {
+                'inputs': {input name: (question id, question type, answer id or False)},
+                'answers': {question id: frozenset of answer ids},
+            }
+
+            Checkbox answers have one input each (``question_<id>_answer_<id>``), the other
+            questions one input (``question_<id>``). The schema is cached until a question
+            or an answer is created, modified or deleted (see ``appointment.question``).
+            The returned value is shared, it must not be modified.
+        """
+        self.ensure_one()
+        return self._get_form_schema_cached(self.id)
+
+    @api.model
+    @tools.ormcache('appointment_type_id')
+    def _get_form_schema_cached(self, appointment_type_id):
+        inputs = {}
+        answers = {}
+        for question in self.browse(appointment_type_id).sudo().question_ids:
+            if question.question_type == 'checkbox':
+                for answer in question.answer_ids:
+                    inputs[f'question_{question.id}_answer_{answer.id}'] = (question.id, 'checkbox', answer.id)
+            else:
+                inputs[f'question_{question.id}'] = (question.id, question.question_type, False)
+            answers[question.id] = frozenset(question.answer_ids.ids)
+        return {'inputs': inputs, 'answers': answers}
+
+    def _parse_form_answers(self, form_values):
+        """ Build the answer input values of a form submission in a single pass over its values.
+            The values do not hold the partner answering yet, so that the answers can be
+            validated before the partner is created.
+
+            :param dict form_values: the submitted form values
+            :return: a tuple (answer input values, errors) where errors maps the invalid
+                input names to an error code
+        """
+        self.ensure_one()
+        schema = self._get_form_schema()
+        inputs, answers = schema['inputs'], schema['answers']
+        base_answer_input_vals = {
+            'appointment_type_id': self.id,
+        }
+        answer_input_values = []
+        errors = {}
+        for name, value in form_values.items():
+            if not value or name not in inputs:
+                continue
+            question_id, question_type, answer_id = inputs[name]
+            if question_type == 'checkbox':
+                answer_input_values.append(dict(base_answer_input_vals, question_id=question_id, value_answer_id=answer_id))
+            elif question_type in ['select', 'radio']:
+                answer_id = int(value) if str(value).isdigit() else False
+                if answer_id not in answers[question_id]:
+                    errors[name] = 'invalid-answer'
+                    continue
+                answer_input_values.append(dict(base_answer_input_vals, question_id=question_id, value_answer_id=answer_id))
+            elif question_type in ['char', 'text']:
+                answer_input_values.append(dict(base_answer_input_vals, question_id=question_id, value_text_box=value.strip()))
+        return answer_input_values, errors
+
+    def _get_cached_slots(self, reference_date, asked_capacity, timezone, lang, compute, filters=()):
+        """ Return the slots of this appointment type computed from ``reference_date`` onwards.
+
+            The result of ``compute()`` is cached per worker and shared by concurrent
+            identical requests. It is reused for at most ``SLOTS_VERSION_LIFETIME`` seconds,
+            as long as no booking touching the months it covers was created, modified or
+            deleted since (see ``hbn.slot.version``).
+
+            :param date reference_date: day the slots are computed from
+            :param int asked_capacity: capacity asked by the customer
+            :param str timezone: timezone the slots are computed in
+            :param str lang: language code the slots are formatted in
+            :param compute: callable computing the slots when they are not cached
+            :param tuple filters: hashable values of every other argument ``compute()``
+                depends on, such as the staff users or resources the slots are restricted to
+        """
+        self.ensure_one()
+        version = self._get_slots_version(reference_date.replace(day=1))
+        key = (self.env.cr.dbname, self.id, reference_date, tuple(filters), asked_capacity, timezone, lang)
+
+        def compute_and_evict():
+            slots = compute()
+            SLOTS_CACHE.discard_if(lambda cached_key: cached_key[:-1] == key and cached_key[-1] != version)
+            return slots
+
+        return SLOTS_CACHE.get_or_compute(key + (version,), compute_and_evict)
+
+    def _get_slots_version(self, month):
+        """ Return the availability version of the slots computed from ``month`` onwards.
+
+            It changes whenever a booking touching these months changes, and at least
+            every ``SLOTS_VERSION_LIFETIME`` seconds.
+        """
+        self.ensure_one()
+        stamp = self.env['hbn.slot.version'].sudo()._get_stamp(self.id, month)
+        return f"{stamp}.{int(time.time() // SLOTS_VERSION_LIFETIME)}"
+
+    @api.model
+    def _invalidate_slots(self, intervals):
+        """ Invalidate the cached slots impacted by bookings on the given intervals.
+
+            :param intervals: iterable of (appointment types, start, stop)
+        """
+        months_by_type = {}
+        for appointment_types, start, stop in intervals:
+            if not appointment_types or not start or not stop:
+                continue
+            # the slots are computed in the customer timezone: widen by a day on each side
+            months = set(_months_between(
+                fields.Date.to_date(start - timedelta(days=1)),
+                fields.Date.to_date(stop + timedelta(days=1)),
+            ))
+            for appointment_type in appointment_types:
+                months_by_type.setdefault(appointment_type.id, set()).update(months)
+        if not months_by_type:
+            return
+        self.env['hbn.slot.version'].sudo()._bump(months_by_type)
+
+        dbname = self.env.cr.dbname
+        last_month_by_type = {type_id: max(months) for type_id, months in months_by_type.items()}
+        SLOTS_CACHE.discard_if(
+            lambda key: key[0] == dbname and key[1] in last_month_by_type
+            and key[2].replace(day=1) <= last_month_by_type[key[1]]
+        )
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import fields, models
+
+
+class AuthOAuthProvider(models.Model):
+    _inherit = "auth.oauth.provider"
+
+    oidc_discovery_url = fields.Char(
+        string="OpenID Discovery URL",
+        help="URL of the OpenID Connect discovery document of the provider "
+             "(.../.well-known/openid-configuration). When set, the ID tokens are verified "
+             "locally with the published keys instead of calling the validation endpoint.",
+    )
@@ -2,12 +2,29 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import logging
+from bisect import insort
+from collections import defaultdict
 from odoo import _, api, fields, models, SUPERUSER_ID
+from odoo.addons.resource.models.utils import Intervals
 from odoo.exceptions import ValidationError
-from odoo.tools import config
+
+from ..tools import opening_windows
 
 _logger = logging.getLogger(__name__)
 
+# Fields that can be written on an event without changing any appointment availability
+SLOTS_NEUTRAL_FIELDS = {
+    'name', 'description', 'sale_order_id', 'booking_id', 'deposit_amount', 'total_price',
+    'post_service_survey_sent', 'post_service_survey_rating',
+}
+# Fields of the bookings used by the client of the booking Gantt, besides the fields of its arch
+GANTT_VIEW_FIELDS = {
+    'display_name', 'start', 'stop', 'allday', 'appointment_status', 'appointment_type_id',
+    'partner_ids', 'resource_ids', 'user_id',
+}
+# Fields of the bookings displayed by the pills of the chair Gantt
+GANTT_PILL_FIELDS = ['name', 'booking_id', 'appointment_status', 'total_price', 'deposit_amount']
+
 class CalendarEvent(models.Model):
     _inherit = "calendar.event"
 
@@ -17,6 +34,8 @@ class CalendarEvent(models.Model):
         string="Deposit Amount",
         compute='_compute_deposit_amount',
         inverse='_inverse_compute_deposit_amount',
+        store=True,
+        index=True,
     )
 
     sale_order = fields.Many2many(
@@ -51,7 +70,9 @@ class CalendarEvent(models.Model):
 
     total_price = fields.Float(
         string="Total Price",
-        compute="_compute_total_price"
+        compute="_compute_total_price",
+        store=True,
+        index=True,
     )
 
     company_currency_id = fields.Many2one(
@@ -62,7 +83,8 @@ class CalendarEvent(models.Model):
 
     booking_id = fields.Char(
         string="Booking ID",
-        store=True
+        store=True,
+        index=True,
     )
 
     post_service_survey_sent = fields.Boolean(
@@ -90,15 +112,23 @@ class CalendarEvent(models.Model):
             res['appointment_type_id'] = False
         return res
         
-    @api.depends('appointment_type_id', 'booking_line_ids')
+    @api.model
+    def _get_view_fields(self, view_type, models):
+        if view_type != 'gantt':
+            return super()._get_view_fields(view_type, models)
+        # web_gantt sends every field of the model to the Gantt, keep the ones the view uses
+        view_fields = set(models.get(self._name, ())) | GANTT_VIEW_FIELDS
+        models = super()._get_view_fields(view_type, models)
+        models[self._name] = [field_name for field_name in models[self._name] if field_name in view_fields]
+        return models
+
+    @api.depends('sale_order_id', 'booking_line_ids.product_variant_id.booking_deposit_amount')
     def _compute_deposit_amount(self):
         for record in self:
-            for booking_line in record.booking_line_ids:
-                price_unit = booking_line.product_variant_id.lst_price,
-                if price_unit[0] <= 500:
-                    record.deposit_amount += 150
-                else:
-                    record.deposit_amount += 300
+            # the deposit order was made for the stored amount: later tier or price changes do not apply
+            if record.sale_order_id:
+                continue
+            record.deposit_amount = record._get_deposit_amount()
 
     @api.depends('appointment_type_id')
     def _inverse_compute_deposit_amount(self):
@@ -118,11 +148,10 @@ class CalendarEvent(models.Model):
         for record in self:
             record.product_tmpl_id = record.appointment_type_id.product_id.product_tmpl_id.id
 
-    @api.depends('booking_line_ids', 'booking_line_ids.product_variant_id')
+    @api.depends('booking_line_ids.product_variant_id.list_price', 'booking_line_ids.product_variant_id.price_extra')
     def _compute_total_price(self):
         for record in self:
-            for product in record.booking_line_ids.product_variant_id:
-                record.total_price += product.lst_price
+            record.total_price = sum(booking_line.product_variant_id.lst_price for booking_line in record.booking_line_ids)
 
     @api.depends('appointment_type_id')
     def _compute_variant_count(self):
@@ -149,75 +178,218 @@ class CalendarEvent(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
+        vals_to_assign = []
         for vals in vals_list:
             if vals['name'] == 'default_name':
                 vals['name'] = self._set_event_name(vals)
             vals['booking_id'] = self.env['ir.sequence'].next_by_code('booking_sequence_code')
 
-            if 'resource_ids' in vals and not vals['resource_ids']:
-                appointment_type_id = vals.get('appointment_type_id')
-                start_str = vals.get('start')
-                stop_str = vals.get('stop')
-
-                if appointment_type_id and start_str and stop_str:
-                    appt_type = self.env['appointment.type'].browse(appointment_type_id)
-                    
-                    # Convert Odoo's string timestamps to Python datetime objects for math
-                    start_date = fields.Datetime.from_string(start_str)
-                    stop_date = fields.Datetime.from_string(stop_str)
-
-                    # --- NEW: Check for specialized salon service buffers ---
-                    # Let's say your wife's blonde service has a specific keyword or code
-                    # You can also add a custom integer field 'x_buffer_minutes' to the appointment.type model!
-                    #buffer_minutes = 0
-                    #if 'blonde' in appt_type.name.lower():
-                    #    buffer_minutes = 45  # Add a 45-minute buffer for blonde sessions
-                    #elif 'extension' in appt_type.name.lower():
-                    #    buffer_minutes = 30  # Add a 30-minute buffer for extensions
-
-                    #if buffer_minutes > 0:
-                        # Dynamically extend the stop time to block out the chair buffer
-                    #    stop_date = stop_date + timedelta(minutes=buffer_minutes)
-                        # Update the values dictionary so Odoo physically saves the longer slot
-                    #    vals['stop'] = fields.Datetime.to_string(stop_date)
-
-                    # --- Resource Chair Check (Using the updated stop_date) ---
-                    if appt_type.schedule_based_on == 'resources':
-                        available_chairs = appt_type.resource_ids
-                        assigned_chair = False
-                        
-                        vals['resource_ids'] = []
-                        for chair in available_chairs:
-                            # Scan for overlaps against the extended duration
-                            overlapping_booking = self.env['calendar.event'].sudo().search([
-                                ('resource_ids', '=', chair.id),
-                                ('start', '<', fields.Datetime.to_string(stop_date)), #type: ignore
-                                ('stop', '>', fields.Datetime.to_string(start_date)), #type: ignore
-                            ], limit=1)
-                            
-                            if not overlapping_booking:
-                                vals['resource_ids'].append([4, chair.id])
-                                assigned_chair += 1
-
-                            if assigned_chair == vals['resource_total_capacity_reserved']:
-                                break
-
-                        if not assigned_chair:
-                            raise ValidationError(_(
-                                "There are no chairs available for this time slot"
-                            ))
-
-        return super(CalendarEvent, self).create(vals_list)
+            # bookings created with their booking lines already have their chairs
+            if 'resource_ids' in vals and not vals['resource_ids'] and not vals.get('booking_line_ids'):
+                if vals.get('appointment_type_id') and vals.get('start') and vals.get('stop'):
+                    vals_to_assign.append(vals)
+
+        if vals_to_assign:
+            self._assign_chairs(vals_to_assign)
+
+        events = super(CalendarEvent, self).create(vals_list)
+        events._invalidate_slots()
+        return events
+
+    def write(self, vals):
+        impacts_slots = not SLOTS_NEUTRAL_FIELDS.issuperset(vals)
+        if impacts_slots:
+            self._invalidate_slots()
+        res = super().write(vals)
+        if impacts_slots:
+            self._invalidate_slots()
+        if 'sale_order_id' in vals:
+            # orders invoiced before being linked to the booking
+            invoices = self.sudo().sale_order_id.invoice_ids
+            self.env.add_to_compute(invoices._fields['calendar_event_id'], invoices)
+            transactions = self.sudo().sale_order_id.transaction_ids | invoices.transaction_ids
+            self.env.add_to_compute(transactions._fields['calendar_event_id'], transactions)
+        return res
 
-    def action_make_deposit(self):
-        self.ensure_one()
-        
-        # 1. Prevent duplicate orders
-        if self.sale_order_id:
+    def unlink(self):
+        self._invalidate_slots()
+        return super().unlink()
+
+    def _invalidate_slots(self):
+        """ Invalidate the cached appointment slots overlapping these events. """
+        self.env['appointment.type']._invalidate_slots([
+            (event.appointment_type_id | event.booking_line_ids.appointment_resource_id.appointment_type_ids,
+             event.start, event.stop)
+            for event in self.sudo()
+        ])
+
+    @api.model
+    def _assign_chairs(self, vals_list):
+        """ Fill ``resource_ids`` of the bookings created without chairs.
+
+        The busy intervals of every candidate chair over the whole batch are loaded with a
+        single query. Chairs are then picked in memory, so that a chair given to a booking
+        of the batch is also seen as busy by the following ones.
+
+        :param list vals_list: create values having an appointment type, a start and a stop
+        """
+        appointment_types = self.env['appointment.type'].browse({vals['appointment_type_id'] for vals in vals_list})
+        bookings = []
+        for vals in vals_list:
+            appt_type = appointment_types.filtered(lambda appt: appt.id == vals['appointment_type_id'])
+            if appt_type.schedule_based_on != 'resources':
+                continue
+
+            # Convert Odoo's string timestamps to Python datetime objects for math
+            start_date = fields.Datetime.to_datetime(vals['start'])
+            stop_date = fields.Datetime.to_datetime(vals['stop'])
+
+            # --- NEW: Check for specialized salon service buffers ---
+            # Let's say your wife's blonde service has a specific keyword or code
+            # You can also add a custom integer field 'x_buffer_minutes' to the appointment.type model!
+            #buffer_minutes = 0
+            #if 'blonde' in appt_type.name.lower():
+            #    buffer_minutes = 45  # Add a 45-minute buffer for blonde sessions
+            #elif 'extension' in appt_type.name.lower():
+            #    buffer_minutes = 30  # Add a 30-minute buffer for extensions
+
+            #if buffer_minutes > 0:
+                # Dynamically extend the stop time to block out the chair buffer
+            #    stop_date = stop_date + timedelta(minutes=buffer_minutes)
+                # Update the values dictionary so Odoo physically saves the longer slot
+            #    vals['stop'] = fields.Datetime.to_string(stop_date)
+
+            bookings.append((vals, appt_type.resource_ids, start_date, stop_date))
+
+        if not bookings:
+            return
+
+        # --- Resource Chair Check: one query for the busy intervals of every candidate chair ---
+        chairs = self.env['appointment.resource'].union(*(booking[1] for booking in bookings))
+        busy_intervals = defaultdict(list)
+        for line in self.env['appointment.booking.line'].sudo().search_read([
+            ('appointment_resource_id', 'in', chairs.ids),
+            ('calendar_event_id.active', '=', True),
+            ('event_start', '<', max(booking[3] for booking in bookings)),
+            ('event_stop', '>', min(booking[2] for booking in bookings)),
+        ], ['appointment_resource_id', 'event_start', 'event_stop'], load=None):
+            busy_intervals[line['appointment_resource_id']].append((line['event_start'], line['event_stop']))
+        for intervals in busy_intervals.values():
+            intervals.sort()
+
+        def is_free(chair_id, start_date, stop_date):
+            for busy_start, busy_stop in busy_intervals[chair_id]:
+                if busy_start >= stop_date:
+                    break
+                if busy_stop > start_date:
+                    return False
             return True
 
-        dep_amount = self.deposit_amount
+        for vals, available_chairs, start_date, stop_date in bookings:
+            capacity = vals.get('resource_total_capacity_reserved') or 1
+            vals['resource_ids'] = []
+            for chair in available_chairs:
+                if not is_free(chair.id, start_date, stop_date):
+                    continue
+                vals['resource_ids'].append([4, chair.id])
+                insort(busy_intervals[chair.id], (start_date, stop_date))
+                if len(vals['resource_ids']) == capacity:
+                    break
+
+            if not vals['resource_ids']:
+                raise ValidationError(_(
+                    "There are no chairs available for this time slot"
+                ))
+
+    def action_make_deposit(self):
+        """ Queue the deposit of the bookings: the sales order, the down payment invoice and its
+            payment, the final invoice and the confirmations are created in the background by
+            ``hbn.deposit.job``, so that confirming a booking does not wait for the accounting.
+        """
+        self.env['hbn.deposit.job'].sudo()._enqueue(self)
+        return True
+
+    def _make_deposits(self):
+        """ Batch variant of the deposit: create the sales orders, down payment invoices, payments
+            and final invoices of all the bookings at once, then confirm each booking.
 
+            The sales orders are created with one ``create``, the down payments with one wizard per
+            order, the payments with one register wizard per partner and currency
+            on a journal chosen once, and the final invoices with one wizard.
+
+            :return: {event_id: {'status': 'done' or 'skipped', 'sale_order_id': int,
+                      'deposit_invoice_id': int, 'final_invoice_ids': list}}
+        """
+        results = {}
+        for event in self.filtered('sale_order_id'):
+            # Prevent duplicate orders
+            results[event.id] = {'status': 'skipped', 'sale_order_id': event.sale_order_id.id}
+        events = self - self.filtered('sale_order_id')
+        if not events:
+            return results
+
+        orders = self.env['sale.order'].create([event._prepare_deposit_order_values() for event in events])
+        orders.action_confirm()
+        order_by_event = dict(zip(events, orders))
+        for event, order in order_by_event.items():
+            event.sale_order_id = order.id
+
+        # a fixed down payment is made on a single order at a time
+        for event, order in order_by_event.items():
+            self.env['sale.advance.payment.inv'].with_context({
+                'active_model': 'sale.order',
+                'active_ids': order.ids,
+                'deduct_down_payments': True,
+            }).create({
+                'advance_payment_method': 'fixed',
+                'fixed_amount': event.deposit_amount,
+            }).create_invoices()
+        dp_invoice_by_order = {order: order.invoice_ids[:1] for order in orders}
+        dp_invoices = self.env['account.move'].union(*dp_invoice_by_order.values())
+        dp_invoices.action_post()
+
+        journal = self.env['account.journal'].search([('type', '=', 'bank')], limit=1)
+        dp_invoices_by_group = defaultdict(lambda: self.env['account.move'])
+        for dp_invoice in dp_invoices:
+            dp_invoices_by_group[dp_invoice.partner_id, dp_invoice.currency_id] |= dp_invoice
+        for group_invoices in dp_invoices_by_group.values():
+            self.env['account.payment.register'].with_context(
+                active_model='account.move',
+                active_ids=group_invoices.ids,
+            ).create({
+                'journal_id': journal.id,
+                'group_payment': True,
+            }).action_create_payments()
+
+        self.env['sale.advance.payment.inv'].with_context({
+            'active_model': 'sale.order',
+            'active_ids': orders.ids,
+            'open_invoice': False,
+            'deduct_down_payments': True,
+        }).create({
+            'advance_payment_method': 'delivered',
+            'consolidated_billing': False,
+        }).create_invoices()
+
+        for event, order in order_by_event.items():
+            dp_invoice = dp_invoice_by_order[order]
+            final_invoices = order.invoice_ids - dp_invoice
+            final_invoices.filtered(lambda invoice: invoice.state == 'draft').write({
+                'invoice_date_due': event.start,
+                'invoice_payment_term_id': False,
+            })
+            event._deposit_confirm(order, dp_invoice)
+            results[event.id] = {
+                'status': 'done',
+                'sale_order_id': order.id,
+                'deposit_invoice_id': dp_invoice.id,
+                'final_invoice_ids': final_invoices.ids,
+            }
+        return results
+
+    def _prepare_deposit_order_values(self):
+        """ Return the values of the sales order of the booking. """
+        self.ensure_one()
         order_line = []
         for booking_line in self.booking_line_ids:
             order_line.append((0, 0, {
@@ -226,19 +398,30 @@ class CalendarEvent(models.Model):
                 'product_uom_qty': booking_line.capacity_reserved,
                 'price_unit': booking_line.product_variant_id.lst_price,
             }))
-
-        # 3. Create the Sales Order for the service booking
-        order = self.env['sale.order'].create({
+        return {
             'partner_id': self.partner_ids.id,
             'origin': self.name,
             'order_line': order_line,
-        })
+        }
+
+    def _deposit_create_order(self):
+        """ Create and confirm the sales order of the booking. """
+        self.ensure_one()
+        # Create the Sales Order for the service booking
+        order = self.env['sale.order'].create(self._prepare_deposit_order_values())
         order.action_confirm()
 
+        # Link it back to the booking, this also prevents duplicate orders
+        self.sale_order_id = order.id
+        return order
+
+    def _deposit_create_down_payment(self, order):
+        """ Create and post the down payment invoice of ``order``, for the deposit amount of the booking. """
+        self.ensure_one()
         #create order for the down payment
         create_values = {
             'advance_payment_method': 'fixed',
-            'fixed_amount': dep_amount
+            'fixed_amount': self.deposit_amount
         }
 
         down_payment_wizard = (self.env['sale.advance.payment.inv']
@@ -254,19 +437,24 @@ class CalendarEvent(models.Model):
         action_values = down_payment_wizard.create_invoices()
         dp_invoice = self.env['account.move'].browse(action_values['res_id']) #type: ignore
         dp_invoice.action_post()
+        return dp_invoice
 
-        # 3. Register a payment for the down payment invoice
+    def _deposit_register_payment(self, dp_invoice):
+        """ Register the payment of the down payment invoice. """
+        self.ensure_one()
         payment_register = self.env['account.payment.register'].with_context(
             active_model='account.move', 
             active_ids=dp_invoice.ids
         ).create({
-            'amount': dep_amount,
+            'amount': self.deposit_amount,
             'journal_id': self.env['account.journal'].search([('type', '=', 'bank')], limit=1).id, # Replace with a valid journal
         })
 
         payment_register.action_create_payments()
 
-        #create invoice with down payment deducted and leave it in draft, so items can be added at payment
+    def _deposit_create_final_invoice(self, order):
+        """ Create the invoice with the down payment deducted and leave it in draft, so items can be added at payment. """
+        self.ensure_one()
         context = {
             'active_model': 'sale.order',
             'active_ids': [order.id],
@@ -281,29 +469,149 @@ class CalendarEvent(models.Model):
         action = down_payment_wizard.create_invoices()
         invoice_ids = action.get('res_id') or action.get('domain',[('id','in',[])])[0][2]
         final_invoices = order.env['account.move'].browse(invoice_ids)  #type: ignore
-        invoice_url = ''
         for invoice in final_invoices:
             if invoice.state == 'draft':
                 invoice.write({
                     'invoice_date_due': self.start,
                     'invoice_payment_term_id': False 
                 })
+        return final_invoices
 
-        invoice_url = f"/inv/{dp_invoice.id}"
-        base_url = config.get("base_url", "https://hairbyning.com")
-        uri = f"{base_url}{invoice_url}"
+    def _deposit_confirm(self, order, dp_invoice):
+        """ Mark the booking as booked and send the confirmation, with the link to the down payment invoice. """
+        self.ensure_one()
+        uri = self.env['hbn.short.link'].sudo()._get_invoice_link(dp_invoice)._get_short_url()
 
-        # 4. Link it back to the booking
-        self.sale_order_id = order.id
         self.appointment_status = 'booked'
-        
-        for attendee in self.attendee_ids:
-            attendee.send_appointment_confirmation(uri) #type: ignore
+        self.env['hbn.outbox.message'].sudo()._enqueue('appointment_confirmation', self.attendee_ids, {'uri': uri})
 
         # Log to chatter so the admin sees it
         self.message_post(body=f"✅ Deposit Order {order.name} created.")
 
-        return True
+    @api.model
+    def _get_gantt_schedule(self, start, stop, resources, timezone=None, open_time=None, close_time=None):
+        """ Return the bookings of the chairs ``resources`` over [start, stop], as displayed by the
+            chair Gantt: the intervals are clipped to the range and only the fields of the pills are
+            read. The occupancy of each chair is counted within the opening hours only.
+
+            :param datetime start: naive UTC datetime
+            :param datetime stop: naive UTC datetime
+            :param resources: ``appointment.resource`` records
+            :param str timezone: timezone of the opening hours
+            :param datetime.time open_time: opening time, the shop is open all day without it
+            :param datetime.time close_time: closing time
+            :return: {
+                'pills': [{'id', 'resource_id', 'start', 'stop', 'clipped_start', 'clipped_stop', <GANTT_PILL_FIELDS>}],
+                'chairs': [{'id', 'name', 'open_seconds', 'busy_seconds', 'occupancy'}],
+            }
+        """
+        lines = self.env['appointment.booking.line'].search_read([
+            ('appointment_resource_id', 'in', resources.ids),
+            ('calendar_event_id.active', '=', True),
+            ('event_start', '<', stop),
+            ('event_stop', '>', start),
+        ], ['appointment_resource_id', 'calendar_event_id', 'event_start', 'event_stop'], load=None)
+        events = self.browse({line['calendar_event_id'] for line in lines})
+        values_by_event = {values['id']: values for values in events.read(GANTT_PILL_FIELDS, load=None)}
+
+        pills = []
+        busy_by_resource = defaultdict(list)
+        for line in lines:
+            line_start, line_stop = max(line['event_start'], start), min(line['event_stop'], stop)
+            pills.append(dict(
+                values_by_event[line['calendar_event_id']],
+                resource_id=line['appointment_resource_id'],
+                start=fields.Datetime.to_string(line_start),
+                stop=fields.Datetime.to_string(line_stop),
+                clipped_start=line['event_start'] < start,
+                clipped_stop=line['event_stop'] > stop,
+            ))
+            busy_by_resource[line['appointment_resource_id']].append((line_start, line_stop, self.browse()))
+
+        opening = Intervals(
+            (window_start, window_stop, self.browse())
+            for window_start, window_stop in opening_windows(start, stop, timezone, open_time, close_time)
+        )
+        open_seconds = sum((window_stop - window_start).total_seconds() for window_start, window_stop, _dummy in opening)
+        chairs = []
+        for resource in resources:
+            busy = Intervals(busy_by_resource[resource.id]) & opening
+            busy_seconds = sum((busy_stop - busy_start).total_seconds() for busy_start, busy_stop, _dummy in busy)
+            chairs.append({
+                'id': resource.id,
+                'name': resource.name,
+                'open_seconds': open_seconds,
+                'busy_seconds': busy_seconds,
+                'occupancy': busy_seconds / open_seconds if open_seconds else 0.0,
+            })
+        return {'pills': pills, 'chairs': chairs}
+
+    @api.model
+    def _find_by_payment_references(self, confirmations):
+        """ Return the bookings paid by ``confirmations``, resolving each of them with a key lookup.
+
+            A confirmation is a dict with any of the keys, by order of precedence:
+            ``booking_id`` (booking reference), ``invoice_id``, ``reference`` (payment transaction
+            reference) and ``partner_id`` (legacy: most recent booking of the partner).
+            Each kind of key is resolved with one query for the whole batch.
+
+            :return: list of bookings (empty when unresolved), aligned with ``confirmations``
+        """
+        def keys(name):
+            return {confirmation[name] for confirmation in confirmations if confirmation.get(name)}
+
+        def to_id(value):
+            record_id = int(value) if str(value or '').isdecimal() else 0
+            return record_id if record_id < 2 ** 31 else 0
+
+        event_by_booking_id = {
+            event.booking_id: event
+            for event in self.search([('booking_id', 'in', list(keys('booking_id')))])
+        } if keys('booking_id') else {}
+        event_by_invoice_id = {
+            invoice.id: invoice.calendar_event_id
+            for invoice in self.env['account.move'].search([
+                ('id', 'in', [to_id(invoice_id) for invoice_id in keys('invoice_id')]),
+                ('calendar_event_id', '!=', False),
+            ])
+        } if keys('invoice_id') else {}
+        event_by_reference = {
+            transaction.reference: transaction.calendar_event_id
+            for transaction in self.env['payment.transaction'].search([
+                ('reference', 'in', list(keys('reference'))),
+                ('calendar_event_id', '!=', False),
+            ])
+        } if keys('reference') else {}
+
+        events = []
+        event_by_partner_id = {}
+        for confirmation in confirmations:
+            event = (
+                event_by_booking_id.get(confirmation.get('booking_id'))
+                or event_by_invoice_id.get(to_id(confirmation.get('invoice_id')))
+                or event_by_reference.get(confirmation.get('reference'))
+            )
+            partner_id = to_id(confirmation.get('partner_id'))
+            if not event and partner_id:
+                if partner_id not in event_by_partner_id:
+                    event_by_partner_id[partner_id] = self.search(
+                        [('partner_ids', 'in', partner_id)], order='create_date desc', limit=1,
+                    )
+                event = event_by_partner_id[partner_id]
+            events.append(event or self.browse())
+        return events
+
+    def _confirm_payment(self):
+        """ Process the payment confirmations of the bookings: queue the deposit of the requested
+            bookings and send the checkout confirmation of the attended ones.
+        """
+        to_deposit = self.filtered(lambda event: event.appointment_status == 'request')
+        to_deposit.action_make_deposit()
+        attended = self.filtered(lambda event: event.appointment_status == 'attended')
+        if attended:
+            attendees = self.env['calendar.attendee'].search([('event_id', 'in', attended.ids)])
+            self.env['hbn.outbox.message'].sudo()._enqueue('checkout_confirmation', attendees)
+        return to_deposit, attended
 
     def action_create_invoice(self):
         self.ensure_one()
@@ -345,15 +653,18 @@ class CalendarEvent(models.Model):
 
     def calculate_deposit_amount(self):
         self.ensure_one()
- 
-        dep_amount = 0.0
-        for booking_line in self.booking_line_ids:
-            if booking_line.product_variant_id.lst_price > 500:
-                dep_amount += 300
-            else:
-                dep_amount += 150
+        return float(self.deposit_amount if self.sale_order_id else self._get_deposit_amount())
 
-        return dep_amount
+    def _get_deposit_amount(self):
+        """ Return the deposit of the booking: the sum of the precomputed deposits of its services
+            (see ``hbn.deposit.tier``).
+        """
+        self.ensure_one()
+        no_service_deposit = self.env['hbn.deposit.tier']._get_deposit(0.0)
+        return sum(
+            booking_line.product_variant_id.booking_deposit_amount if booking_line.product_variant_id else no_service_deposit
+            for booking_line in self.booking_line_ids
+        )
             
 
     def _set_event_name(self, values):
@@ -373,8 +684,9 @@ class CalendarEvent(models.Model):
         for event in self:
             resources = event.resource_ids
             if resources:
-                # Ignore the inverse and keep the previous booking lines when we duplicate an event
-                if self.env.context.get('is_appointment_copied'):
+                # Ignore the inverse and keep the previous booking lines when we duplicate an event,
+                # or when the booking lines were allocated with the booking (see the booking form)
+                if self.env.context.get('is_appointment_copied') or self.env.context.get('hbn_booking_lines_allocated'):
                     continue
                 if event.appointment_type_manage_capacity and event.resource_total_capacity_reserved:
                     capacity_to_reserve = event.resource_total_capacity_reserved
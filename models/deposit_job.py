@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Stages of a deposit, in execution order
+DEPOSIT_STAGES = ['order', 'down_payment', 'payment', 'final_invoice', 'confirm']
+DEPOSIT_MAX_ATTEMPTS = 5
+# Delay before the first retry of a failed stage, doubled at each attempt
+DEPOSIT_RETRY_DELAY = timedelta(minutes=1)
+
+
+class DepositJob(models.Model):
+    """ Deposit of a booking, executed in the background by a cron.
+
+        Each stage runs in its own transaction: a stage that fails is retried later with an
+        exponential backoff and the job resumes from it, without redoing the previous ones.
+    """
+    _name = "hbn.deposit.job"
+    _description = "Booking Deposit Job"
+    _order = "id"
+
+    event_id = fields.Many2one('calendar.event', string="Booking", required=True, ondelete='cascade', index=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pending'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string="Status",
+        default='pending',
+        required=True,
+        index=True,
+    )
+    stage = fields.Selection(
+        selection=[
+            ('order', 'Sales Order'),
+            ('down_payment', 'Down Payment Invoice'),
+            ('payment', 'Down Payment'),
+            ('final_invoice', 'Final Invoice'),
+            ('confirm', 'Confirmation'),
+            ('done', 'Done'),
+        ],
+        default='order',
+        required=True,
+    )
+    attempts = fields.Integer(default=0)
+    next_attempt_date = fields.Datetime(default=fields.Datetime.now, required=True)
+    last_error = fields.Text()
+    sale_order_id = fields.Many2one('sale.order', string="Sales Order", ondelete='set null')
+    deposit_invoice_id = fields.Many2one('account.move', string="Down Payment Invoice", ondelete='set null')
+
+    @api.model
+    def _enqueue(self, events):
+        """ Create the deposit jobs of ``events`` and wake the runner up.
+
+            Bookings that already have a sales order or a pending job are skipped.
+        """
+        busy_events = self.search([('event_id', 'in', events.ids), ('state', '=', 'pending')]).event_id
+        events = events.filtered(lambda event: not event.sale_order_id) - busy_events
+        jobs = self.create([{'event_id': event.id} for event in events])
+        if jobs:
+            self.env.ref('hair_by_ning.ir_cron_hbn_deposit_job')._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process(self, limit=50):
+        """ Run the pending jobs that are due, each stage in its own transaction. """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self.env.cr.execute("""
+            SELECT id
+              FROM hbn_deposit_job
+             WHERE state = 'pending'
+               AND next_attempt_date <= NOW() AT TIME ZONE 'UTC'
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        jobs = self.browse(row[0] for row in self.env.cr.fetchall())
+        fresh_jobs = jobs.filtered(lambda job: job.stage == 'order' and not job.attempts)
+        if len(fresh_jobs) > 1:
+            jobs -= fresh_jobs._run_batch(auto_commit)
+        for job in jobs:
+            job._run(auto_commit)
+
+    def _run_batch(self, auto_commit=True):
+        """ Run the deposits of jobs that did not start yet all at once (see
+            ``calendar.event._make_deposits``).
+
+            :return: the jobs done; the jobs whose booking was skipped by the batch, or all of
+                them when the batch failed, are left pending to be run stage by stage
+        """
+        try:
+            with self.env.cr.savepoint():
+                results = self.event_id._make_deposits()
+                done_jobs = self.filtered(lambda job: (
+                    results.get(job.event_id.id, {}).get('status') == 'done'
+                    and results[job.event_id.id].get('deposit_invoice_id')
+                ))
+                for job in done_jobs:
+                    result = results[job.event_id.id]
+                    job.write({
+                        'state': 'done',
+                        'stage': 'done',
+                        'sale_order_id': result.get('sale_order_id'),
+                        'deposit_invoice_id': result.get('deposit_invoice_id'),
+                    })
+        except Exception:
+            _logger.exception("Deposit jobs %s: batch failed, running them one by one", self.ids)
+            self.env.invalidate_all()
+            return self.browse()
+        if auto_commit:
+            self.env.cr.commit()
+        return done_jobs
+
+    def _run(self, auto_commit=True):
+        self.ensure_one()
+        while self.state == 'pending':
+            try:
+                with self.env.cr.savepoint():
+                    getattr(self, f'_stage_{self.stage}')()
+                    next_stage = DEPOSIT_STAGES.index(self.stage) + 1
+                    if next_stage == len(DEPOSIT_STAGES):
+                        self.write({'stage': 'done', 'state': 'done', 'last_error': False})
+                    else:
+                        self.write({'stage': DEPOSIT_STAGES[next_stage], 'attempts': 0})
+            except Exception as e:
+                _logger.exception("Deposit job %s: stage %s failed", self.id, self.stage)
+                self.env.invalidate_all()
+                self._retry_later(str(e))
+            if auto_commit:
+                self.env.cr.commit()
+            if self.state == 'pending' and self.next_attempt_date > fields.Datetime.now():
+                break
+
+    def _retry_later(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        self.write({
+            'attempts': attempts,
+            'last_error': error,
+            'state': 'failed' if attempts >= DEPOSIT_MAX_ATTEMPTS else 'pending',
+            'next_attempt_date': fields.Datetime.now() + DEPOSIT_RETRY_DELAY * 2 ** (attempts - 1),
+        })
+
+    def _stage_order(self):
+        # Prevent duplicate orders
+        order = self.event_id.sale_order_id or self.event_id._deposit_create_order()
+        self.sale_order_id = order
+
+    def _stage_down_payment(self):
+        self.deposit_invoice_id = self.event_id._deposit_create_down_payment(self.sale_order_id)
+
+    def _stage_payment(self):
+        self.event_id._deposit_register_payment(self.deposit_invoice_id)
+
+    def _stage_final_invoice(self):
+        self.event_id._deposit_create_final_invoice(self.sale_order_id)
+
+    def _stage_confirm(self):
+        self.event_id._deposit_confirm(self.sale_order_id, self.deposit_invoice_id)
+
+    def _get_status(self):
+        """ Return the status of the job, as polled by the booking UI. """
+        self.ensure_one()
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'error': self.last_error if self.state == 'failed' else False,
+            'appointment_status': self.event_id.appointment_status,
+            'sale_order_id': self.sale_order_id.id,
+            'deposit_invoice_id': self.deposit_invoice_id.id,
+        }
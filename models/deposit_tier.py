@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models, tools
+from odoo.tools.sql import column_exists, create_column
+
+
+class DepositTier(models.Model):
+    """ Deposit asked per booked service, by price range of the service. """
+    _name = "hbn.deposit.tier"
+    _description = "Booking Deposit Tier"
+    _order = "open_ended, max_price, id"
+
+    max_price = fields.Float(
+        string="Up To Price",
+        help="Highest service price (included) of the tier.",
+    )
+    open_ended = fields.Boolean(
+        string="All Higher Prices",
+        help="The tier covers every price above the other tiers, whatever its price.",
+    )
+    amount = fields.Integer(string="Deposit", required=True)
+
+    _sql_constraints = [
+        ('amount_positive', 'CHECK(amount >= 0)', 'A deposit cannot be negative.'),
+    ]
+
+    def _auto_init(self):
+        # The open-ended tier used to be the one without price, which could not be told
+        # apart from a tier up to a price of 0
+        if not column_exists(self.env.cr, 'hbn_deposit_tier', 'open_ended') and column_exists(self.env.cr, 'hbn_deposit_tier', 'max_price'):
+            create_column(self.env.cr, 'hbn_deposit_tier', 'open_ended', 'boolean')
+            self.env.cr.execute("UPDATE hbn_deposit_tier SET open_ended = COALESCE(max_price, 0) = 0")
+        return super()._auto_init()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        tiers = super().create(vals_list)
+        self._refresh_deposits()
+        return tiers
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._refresh_deposits()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._refresh_deposits()
+        return res
+
+    @api.model
+    def _refresh_deposits(self):
+        """ Recompute the deposit of every service variant, in bulk. """
+        self.env.registry.clear_cache()  # _get_tiers
+        products = self.env['product.product'].with_context(active_test=False).search([])
+        self.env.add_to_compute(products._fields['booking_deposit_amount'], products)
+
+    @api.model
+    @tools.ormcache()
+    def _get_tiers(self):
+        """ Return the tiers as a tuple of (max price, amount), by increasing max price,
+            the open-ended tier last.
+        """
+        tiers = self.sudo().search([])
+        bounded = tuple((tier.max_price, tier.amount) for tier in tiers if not tier.open_ended)
+        unbounded = tuple((None, tier.amount) for tier in tiers if tier.open_ended)[:1]
+        return bounded + unbounded
+
+    @api.model
+    def _get_deposit(self, price):
+        """ Return the deposit of a service priced ``price``: the amount of the first tier
+            covering it, or 0 when no tier does.
+        """
+        for max_price, amount in self._get_tiers():
+            if max_price is None or price <= max_price:
+                return amount
+        return 0
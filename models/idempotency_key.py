@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+from datetime import date, datetime, timedelta
+
+from odoo import api, fields, models
+
+IDEMPOTENCY_KEY_LIFETIME = timedelta(hours=24)
+
+
+def _json_default(value):
+    """ Serialize values the way JSON routes send them, so that a replayed response
+        is identical to the original one.
+    """
+    if isinstance(value, datetime):
+        return fields.Datetime.to_string(value)
+    if isinstance(value, date):
+        return fields.Date.to_string(value)
+    return str(value)
+
+
+class IdempotencyKey(models.Model):
+    """ Response of a request sent with an idempotency key, replayed when the client retries it.
+
+        The key is claimed in the transaction of the request: a concurrent duplicate blocks on
+        the unique index until the first request commits (and then replays its response) or
+        rolls back (and then runs in its place).
+    """
+    _name = "hbn.idempotency.key"
+    _description = "Idempotency Key"
+
+    scope = fields.Char(required=True)
+    key = fields.Char(required=True)
+    response = fields.Json()
+    expiration_date = fields.Datetime(required=True, index=True)
+
+    _sql_constraints = [
+        ('scope_key_uniq', 'unique(scope, key)', 'An idempotency key can only be used once per scope.'),
+    ]
+
+    @api.model
+    def _claim(self, scope, key):
+        """ Claim ``key`` for the current request.
+
+            :return: a tuple (claimed, response): ``claimed`` is True when the caller must
+                process the request and then ``_store`` its response or ``_release`` the key,
+                otherwise ``response`` is the response of the original request, or None when
+                that request is still being processed
+        """
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            INSERT INTO hbn_idempotency_key (scope, key, expiration_date, create_uid, create_date, write_uid, write_date)
+                 VALUES (%(scope)s, %(key)s, %(expiration_date)s, %(uid)s, %(now)s, %(uid)s, %(now)s)
+            ON CONFLICT (scope, key)
+              DO UPDATE SET expiration_date = EXCLUDED.expiration_date, response = NULL, write_date = EXCLUDED.write_date
+                      WHERE hbn_idempotency_key.expiration_date < %(now)s
+              RETURNING id
+        """, {
+            'scope': scope,
+            'key': key,
+            'expiration_date': now + IDEMPOTENCY_KEY_LIFETIME,
+            'uid': self.env.uid,
+            'now': now,
+        })
+        if self.env.cr.fetchone():
+            return True, None
+        self.env.cr.execute("SELECT response FROM hbn_idempotency_key WHERE scope = %s AND key = %s", (scope, key))
+        row = self.env.cr.fetchone()
+        return False, row and row[0]
+
+    @api.model
+    def _store(self, scope, key, response):
+        """ Store the JSON response of the request having claimed ``key``. """
+        response = json.loads(json.dumps(response, default=_json_default))
+        self.env.cr.execute(
+            "UPDATE hbn_idempotency_key SET response = %s::jsonb WHERE scope = %s AND key = %s",
+            (json.dumps(response), scope, key),
+        )
+        return response
+
+    @api.model
+    def _release(self, scope, key):
+        """ Release ``key`` without storing a response (e.g. redirections or errors), so that
+            a retry of the request is processed again.
+        """
+        self.env.cr.execute("DELETE FROM hbn_idempotency_key WHERE scope = %s AND key = %s", (scope, key))
+
+    @api.autovacuum
+    def _gc_expired_keys(self):
+        self.env.cr.execute("DELETE FROM hbn_idempotency_key WHERE expiration_date < %s", (fields.Datetime.now(),))
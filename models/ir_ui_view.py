@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import hashlib
+import json
+
 from odoo import fields, models, _
 from odoo.tools import format_list
 from lxml import etree
 
+from ..tools import SharedCache, parse_time_of_day
+
 GANTT_VALID_ATTRIBUTES = set([
     '__validate__',                     # ir.ui.view implementation detail
     'date_start',
@@ -50,8 +55,49 @@ GANTT_VALID_ATTRIBUTES = set([
     'groups_limit',
     'slot_min_time',     # Newly added attribute
     'slot_max_time',     # Newly added attribute
+    'business_hours',    # set by _postprocess_tag_gantt
 ])
 
+# Attributes of the gantt tag naming fields of the model
+GANTT_FIELD_ATTRIBUTES = [
+    'date_start',
+    'date_stop',
+    'default_group_by',
+    'progress',
+    'color',
+    'consolidation',
+    'dependency_field',
+    'dependency_inverted_field',
+]
+
+# Keys of the gantt nodes found valid, see _get_gantt_validation_key
+GANTT_VALIDATED = SharedCache(maxsize=256)
+
+
+def _get_gantt_validation_key(node):
+    """ Return a hash of what the validation of a gantt node depends on: its attributes and the tags
+        of its children. Reformatting the arch or changing the templates keep the same key.
+    """
+    normalized = (
+        sorted(node.attrib.items()),
+        [child.tag for child in node.iterchildren(tag=etree.Element)],
+    )
+    return hashlib.sha256(repr(normalized).encode()).hexdigest()
+
+
+def _get_gantt_business_hours(node):
+    """ Return the opening hours of a gantt node as {'open': [hour, minute], 'close': [hour, minute]},
+        or None when it shows full days.
+    """
+    slot_min_time, slot_max_time = node.get('slot_min_time'), node.get('slot_max_time')
+    if not slot_min_time or not slot_max_time:
+        return None
+    open_time, close_time = parse_time_of_day(slot_min_time), parse_time_of_day(slot_max_time)
+    return {
+        'open': [open_time.hour, open_time.minute],
+        'close': [close_time.hour, close_time.minute],
+    }
+
 class View(models.Model):
     _inherit = 'ir.ui.view'
 
@@ -61,6 +107,10 @@ class View(models.Model):
         if not node_info['validate']:
             return
 
+        key = _get_gantt_validation_key(node)
+        if GANTT_VALIDATED.get(key):
+            return
+
         templates_count = 0
         for child in node.iterchildren(tag=etree.Element):
             if child.tag == 'templates':
@@ -102,22 +152,14 @@ class View(models.Model):
             msg = _("Gantt must have a 'dependency_inverted_field' attribute once the 'dependency_field' is specified")
             self._raise_view_error(msg, node)
 
-        # Validate slotMinTime attribute, if present
-        slot_min_time = node.get('slot_min_time')
-        if slot_min_time:
-            try:
-                # Validate time format HH:MM or HH:MM:SS using Odoo's datetime utility
-                fields.Datetime.from_string(f"2000-01-01 {slot_min_time}")
-            except Exception:
-                self._raise_view_error(_("Invalid slotMinTime value '%s' in gantt") % slot_min_time, node)
-
-        # Validate slotMaxTime attribute, if present
-        slot_max_time = node.get('slot_max_time')
-        if slot_max_time:
-            try:
-                fields.Datetime.from_string(f"2000-01-01 {slot_max_time}")
-            except Exception:
-                self._raise_view_error(_("Invalid slotMaxTime value '%s' in gantt") % slot_max_time, node)
+        # Validate the business hours attributes, if present
+        for attribute in ('slot_min_time', 'slot_max_time'):
+            value = node.get(attribute)
+            if value:
+                try:
+                    parse_time_of_day(value)
+                except ValueError:
+                    self._raise_view_error(_("Invalid %(attribute)s value '%(value)s' in gantt", attribute=attribute, value=value), node)
 
         remaining = attrs - GANTT_VALID_ATTRIBUTES
         if remaining:
@@ -128,11 +170,22 @@ class View(models.Model):
             )
             self._raise_view_error(msg, node)
 
-    def _get_view_fields(self, view_type, models):
-        if view_type == 'gantt':
-            models[self._name] = list(self._fields.keys())
-            return models
-        return super()._get_view_fields(view_type, models)
+        GANTT_VALIDATED.set(key, True)
+
+    def _postprocess_tag_gantt(self, node, name_manager, node_info):
+        postprocess = getattr(super(), '_postprocess_tag_gantt', None)
+        if postprocess:
+            postprocess(node, name_manager, node_info)
+        # Declare the fields named by the attributes, only the fields of the view are sent to the client
+        for attribute in GANTT_FIELD_ATTRIBUTES:
+            for field_name in (node.get(attribute) or '').split(','):
+                field_name = field_name.strip()
+                if field_name and field_name in name_manager.model._fields:
+                    name_manager.has_field(node, field_name, {})
+        # Hand the opening hours to the client already parsed
+        business_hours = _get_gantt_business_hours(node)
+        if business_hours:
+            node.set('business_hours', json.dumps(business_hours))
 
     def _get_view_info(self):
         return {'gantt': {'icon': 'fa fa-tasks'}} | super()._get_view_info()
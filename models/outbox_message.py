@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import config
+
+from ..tools import BatchMetrics, LocalTransport, OutboxSendError
+
+_logger = logging.getLogger(__name__)
+
+OUTBOX_MAX_ATTEMPTS = 5
+# Delay before the first retry of a failed message, doubled at each attempt
+OUTBOX_RETRY_DELAY = timedelta(minutes=1)
+# Sent messages are kept this long for auditing, then garbage collected, except the
+# messages of the unique channels, kept so that they are never queued again
+OUTBOX_SENT_LIFETIME = timedelta(days=7)
+# Maximum number of messages sent in one call, per channel
+OUTBOX_BATCH_SIZES = {
+    'conversion': 50,
+}
+OUTBOX_DEFAULT_BATCH_SIZE = 100
+# Channels sending at most one message per booking attendee
+OUTBOX_UNIQUE_CHANNELS = {'conversion'}
+# Channels whose messages are delivered all at once: a failure delivers none of them
+OUTBOX_BATCH_CHANNELS = {'conversion'}
+LOCAL_TRANSPORT = LocalTransport()
+
+
+class AttendeeTransport:
+    """ Transport sending the messages through the notification methods of the attendees.
+
+        Channels in ``OUTBOX_BATCH_CHANNELS`` hand the whole batch to the attendees in one
+        call; whether that call makes a single request to the provider is up to the notification
+        method of the attendees (``send_conversion_api_event``). The messages of the other
+        channels are handed over one by one, each in its own savepoint.
+    """
+
+    def send(self, channel, messages):
+        getattr(messages, f'_send_{channel}')()
+
+
+class OutboxMessage(models.Model):
+    """ Notification of a booking attendee, written in the transaction of the change that
+        causes it and sent afterwards by a cron.
+
+        A rolled back change never notifies anybody, and a failing messaging provider neither
+        slows down nor rolls back the booking and accounting work: messages are sent in batches
+        per channel, each batch in its own transaction, and retried with an exponential backoff.
+    """
+    _name = "hbn.outbox.message"
+    _description = "Booking Notification"
+    _order = "id"
+
+    channel = fields.Selection(
+        selection=[
+            ('appointment_confirmation', 'Appointment Confirmation'),
+            ('checkout_confirmation', 'Checkout Confirmation'),
+            ('conversion', 'Conversion Event'),
+        ],
+        required=True,
+    )
+    attendee_id = fields.Many2one('calendar.attendee', string="Attendee", required=True, ondelete='cascade')
+    event_id = fields.Many2one('calendar.event', string="Booking", related='attendee_id.event_id', store=True, index=True)
+    payload = fields.Json()
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pending'),
+            ('sent', 'Sent'),
+            ('failed', 'Failed'),
+        ],
+        string="Status",
+        default='pending',
+        required=True,
+        index=True,
+    )
+    attempts = fields.Integer(default=0)
+    next_attempt_date = fields.Datetime(default=fields.Datetime.now, required=True)
+    sent_date = fields.Datetime()
+    last_error = fields.Text()
+
+    def init(self):
+        # at most one live message per attendee on the unique channels, also between
+        # concurrent transactions; _enqueue relies on it to skip the duplicates
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS hbn_outbox_message_unique_channel_attendee_idx
+                ON hbn_outbox_message (channel, attendee_id)
+             WHERE channel IN %s AND state != 'failed'
+        """, (tuple(sorted(OUTBOX_UNIQUE_CHANNELS)),))
+
+    @api.model
+    def _enqueue(self, channel, attendees, payload=None):
+        """ Queue a message of ``channel`` for each of ``attendees`` and wake the sender up.
+
+            Attendees already having a message of a channel in ``OUTBOX_UNIQUE_CHANNELS`` are skipped.
+        """
+        if channel in OUTBOX_UNIQUE_CHANNELS:
+            messages = self._insert_unique(channel, attendees, payload)
+        else:
+            messages = self.create([{
+                'channel': channel,
+                'attendee_id': attendee.id,
+                'payload': payload,
+            } for attendee in attendees])
+        if messages:
+            self.env.ref('hair_by_ning.ir_cron_hbn_outbox')._trigger()
+        return messages
+
+    @api.model
+    def _insert_unique(self, channel, attendees, payload):
+        """ Insert the messages of the unique ``channel``, skipping the attendees having one
+            already, including in a concurrent transaction.
+        """
+        if not attendees:
+            return self.browse()
+        attendees.flush_recordset(['event_id'])
+        self.flush_model(['channel', 'attendee_id', 'state'])
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            INSERT INTO hbn_outbox_message (channel, attendee_id, event_id, payload, state, attempts,
+                                            next_attempt_date, create_uid, create_date, write_uid, write_date)
+                 SELECT %(channel)s, attendee.id, attendee.event_id, %(payload)s::jsonb, 'pending', 0,
+                        %(now)s, %(uid)s, %(now)s, %(uid)s, %(now)s
+                   FROM calendar_attendee attendee
+                  WHERE attendee.id = ANY(%(attendee_ids)s)
+               ORDER BY attendee.id
+            ON CONFLICT (channel, attendee_id) WHERE channel IN %(channels)s AND state != 'failed'
+             DO NOTHING
+              RETURNING id
+        """, {
+            'channel': channel,
+            'payload': json.dumps(payload) if payload is not None else None,
+            'now': now,
+            'uid': self.env.uid,
+            'attendee_ids': attendees.ids,
+            'channels': tuple(sorted(OUTBOX_UNIQUE_CHANNELS)),
+        })
+        return self.browse(sorted(row[0] for row in self.env.cr.fetchall()))
+
+    @api.model
+    def _get_transport(self):
+        """ Return the transport sending the messages: an object with a ``send(channel, messages)``
+            method. Messages are sent through the attendees, unless the local stand-in is configured.
+        """
+        if config.get('hbn_outbox_transport') == 'local':
+            return LOCAL_TRANSPORT
+        return AttendeeTransport()
+
+    def _send_appointment_confirmation(self):
+        for message in self:
+            message.attendee_id.send_appointment_confirmation(message.payload['uri']) #type: ignore
+
+    def _send_checkout_confirmation(self):
+        self.attendee_id.send_booking_checkout_confirmation() #type: ignore
+
+    def _send_conversion(self):
+        self.attendee_id.send_conversion_api_event() #type: ignore
+
+    @api.model
+    def _cron_process(self, limit=200, transport=None):
+        """ Send the pending messages that are due, in batches per channel, each batch in its
+            own transaction.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        transport = transport or self._get_transport()
+        metrics = BatchMetrics()
+        self.env.cr.execute("""
+            SELECT id
+              FROM hbn_outbox_message
+             WHERE state = 'pending'
+               AND next_attempt_date <= NOW() AT TIME ZONE 'UTC'
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        messages = self.browse(row[0] for row in self.env.cr.fetchall())
+        for channel in dict.fromkeys(messages.mapped('channel')):
+            channel_messages = messages.filtered(lambda message: message.channel == channel)
+            batch_size = OUTBOX_BATCH_SIZES.get(channel, OUTBOX_DEFAULT_BATCH_SIZE)
+            for index in range(0, len(channel_messages), batch_size):
+                batch = channel_messages[index:index + batch_size]
+                batch._send(transport, metrics)
+                if auto_commit:
+                    self.env.cr.commit()
+        for channel, counters in metrics.snapshot().items():
+            _logger.info(
+                "Outbox: channel %s, %s message(s) in %s call(s), %s failed, latency avg %.3fs max %.3fs",
+                channel, counters['messages'], counters['batches'], counters['failures'],
+                counters['latency_avg'], counters['latency_max'],
+            )
+        if len(messages) == limit:
+            self.env.ref('hair_by_ning.ir_cron_hbn_outbox')._trigger()
+
+    def _send(self, transport, metrics):
+        """ Send the messages of one channel. Channels in ``OUTBOX_BATCH_CHANNELS`` send them in
+            one call, and the messages of a failed call that the transport did not acknowledge
+            are sent again one by one, so that only the failing ones are retried. The other
+            channels send each message in its own savepoint, so that the side effects of the
+            messages sent (queued mails, chatter posts) survive the failure of another one.
+
+            :param metrics: ``BatchMetrics`` of the current run of the cron
+        """
+        if self[0].channel not in OUTBOX_BATCH_CHANNELS:
+            for message in self:
+                message._send_batch(transport, metrics)
+            return
+        unsent = self._send_batch(transport, metrics)
+        if len(self) > 1:
+            for message in unsent:
+                message._send_batch(transport, metrics)
+
+    def _send_batch(self, transport, metrics):
+        """ Send the messages of one channel in one call, in a savepoint.
+
+            :param metrics: ``BatchMetrics`` of the current run of the cron
+            :return: the messages that were not sent; a single message that failed is retried later
+        """
+        channel = self[0].channel
+        start = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                transport.send(channel, self)
+                self._mark_sent()
+        except Exception as e:
+            metrics.record(channel, len(self), time.perf_counter() - start, success=False)
+            _logger.warning("Outbox: %s message(s) of channel %s failed: %s", len(self), channel, e)
+            self.env.invalidate_all()
+            sent = self.filtered(lambda message: message.id in e.sent_ids) if isinstance(e, OutboxSendError) else self.browse()
+            sent._mark_sent()
+            unsent = self - sent
+            if unsent and len(self) == 1:
+                unsent._retry_later(str(e))
+            return unsent
+        latency = time.perf_counter() - start
+        metrics.record(channel, len(self), latency, success=True)
+        _logger.debug("Outbox: %s message(s) of channel %s sent in %.3fs", len(self), channel, latency)
+        return self.browse()
+
+    def _mark_sent(self):
+        self.write({'state': 'sent', 'sent_date': fields.Datetime.now(), 'last_error': False})
+
+    def _retry_later(self, error):
+        self.ensure_one()
+        attempts = self.attempts + 1
+        self.write({
+            'attempts': attempts,
+            'last_error': error,
+            'state': 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending',
+            'next_attempt_date': fields.Datetime.now() + OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        })
+
+    @api.autovacuum
+    def _gc_sent_messages(self):
+        self.search([
+            ('state', '=', 'sent'),
+            ('channel', 'not in', list(OUTBOX_UNIQUE_CHANNELS)),
+            ('sent_date', '<', fields.Datetime.now() - OUTBOX_SENT_LIFETIME),
+        ]).unlink()
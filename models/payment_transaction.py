@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+
+
+class PaymentTransaction(models.Model):
+    _inherit = "payment.transaction"
+
+    calendar_event_id = fields.Many2one(
+        'calendar.event',
+        string="Booking",
+        compute='_compute_calendar_event_id',
+        store=True,
+        index='btree_not_null',
+        readonly=True,
+    )
+
+    @api.depends('invoice_ids.calendar_event_id', 'sale_order_ids')
+    def _compute_calendar_event_id(self):
+        orders = self.sale_order_ids
+        event_by_order = {
+            event.sale_order_id: event
+            for event in self.env['calendar.event'].sudo().search([('sale_order_id', 'in', orders.ids)])
+        } if orders else {}
+        for transaction in self:
+            transaction.calendar_event_id = transaction.invoice_ids.calendar_event_id[:1] or next(
+                (event_by_order[order] for order in transaction.sale_order_ids if order in event_by_order),
+                False,
+            )
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+
+
+class ProductProduct(models.Model):
+    _inherit = "product.product"
+
+    booking_deposit_amount = fields.Integer(
+        string="Booking Deposit",
+        compute='_compute_booking_deposit_amount',
+        store=True,
+        readonly=True,
+        help="Deposit asked when this service is booked, given by the deposit tiers.",
+    )
+
+    @api.depends('list_price', 'price_extra')
+    def _compute_booking_deposit_amount(self):
+        DepositTier = self.env['hbn.deposit.tier']
+        for product in self:
+            product.booking_deposit_amount = DepositTier._get_deposit(product.lst_price)
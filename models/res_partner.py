@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import functools
+import logging
+import threading
+
+from odoo import api, fields, models
+from odoo.addons.phone_validation.tools import phone_validation
+from odoo.tools import email_normalize
+from odoo.tools.sql import column_exists, create_column
+
+_logger = logging.getLogger(__name__)
+
+PHONE_KEY_BACKFILL_PARAM = 'hair_by_ning.phone_e164_backfill_id'
+
+
+@functools.lru_cache(maxsize=1024)
+def _phone_key(number, country_code, country_phone_code):
+    """ Return ``number`` in E.164 format, or False when it cannot be parsed. """
+    formatted = phone_validation.phone_format(
+        number, country_code, country_phone_code,
+        force_format='E164', raise_exception=False,
+    )
+    return formatted if formatted and formatted.startswith('+') else False
+
+
+def _name_key(name):
+    """ Return ``name`` without its case and spacing differences. """
+    return ' '.join((name or '').split()).casefold()
+
+
+class ResPartner(models.Model):
+    _inherit = "res.partner"
+
+    phone_e164 = fields.Char(
+        string="Normalized Phone",
+        compute='_compute_phone_e164',
+        store=True,
+        index='btree_not_null',
+        readonly=True,
+    )
+
+    def _auto_init(self):
+        # Create the column without computing it for every existing partner at install,
+        # the cron backfills it in batches
+        if not column_exists(self.env.cr, 'res_partner', 'phone_e164'):
+            create_column(self.env.cr, 'res_partner', 'phone_e164', 'varchar')
+            self.env['ir.config_parameter'].sudo().set_param(PHONE_KEY_BACKFILL_PARAM, 0)
+        return super()._auto_init()
+
+    @api.depends('phone', 'country_id', 'company_id.country_id')
+    def _compute_phone_e164(self):
+        for partner in self:
+            partner.phone_e164 = partner._get_phone_key(partner.phone, partner.country_id or partner.company_id.country_id)
+
+    @api.model
+    def _get_phone_key(self, number, country=None):
+        """ Return the E.164 normalized key of ``number``. Parsing results are memoized per worker.
+
+            :param country: country of the number when it is not in international format;
+              without it, only numbers in international format have a key
+        """
+        if not number:
+            return False
+        return _phone_key(number, country and country.code or None, country and country.phone_code or None)
+
+    @api.model
+    def _find_by_phone(self, number, email, country=None, name=None):
+        """ Return the customer having the same normalized phone as ``number`` and the same
+            normalized email as ``email``, if any. Without an email, the customer must have
+            the same name instead, ignoring case and spacing. A phone alone does not identify
+            anyone, and the partners of internal users are never matched.
+        """
+        phone_key = self._get_phone_key(number, country)
+        email = email_normalize(email)
+        if not phone_key or not (email or name):
+            return self.browse()
+        domain = [
+            ('phone_e164', '=', phone_key),
+            ('user_ids', 'not any', [('share', '=', False)]),
+        ]
+        if email:
+            return self.search(domain + [('email_normalized', '=', email)], order='id', limit=1)
+        name_key = _name_key(name)
+        return self.search(domain, order='id').filtered(lambda partner: _name_key(partner.name) == name_key)[:1]
+
+    @api.model
+    def _cron_backfill_phone_e164(self, batch_size=1000):
+        """ Compute the normalized phone of the partners existing before the field, by batches. """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        ICP = self.env['ir.config_parameter'].sudo()
+        last_id = ICP.get_param(PHONE_KEY_BACKFILL_PARAM)
+        if last_id is False:
+            return
+        partners = self.with_context(active_test=False).search(
+            [('id', '>', int(last_id)), ('phone', '!=', False)], order='id', limit=batch_size,
+        )
+        if not partners:
+            ICP.set_param(PHONE_KEY_BACKFILL_PARAM, False)
+            return
+        self.env.add_to_compute(self._fields['phone_e164'], partners)
+        partners._recompute_recordset(['phone_e164'])
+        partners.flush_recordset(['phone_e164'])
+        ICP.set_param(PHONE_KEY_BACKFILL_PARAM, partners[-1].id)
+        _logger.info("Normalized phone: %s partners backfilled, up to id %s", len(partners), partners[-1].id)
+        if auto_commit:
+            self.env.cr.commit()
+        self.env.ref('hair_by_ning.ir_cron_hbn_phone_e164_backfill')._trigger()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import time
+
+from odoo import api, models
+from odoo.exceptions import AccessDenied
+from odoo.tools import config
+
+from ..tools import OidcClient, OidcError
+
+_logger = logging.getLogger(__name__)
+
+_oidc_client = None
+
+
+def _get_oidc_client():
+    """ Return the OpenID Connect client of this worker, created on first use so that
+        its connection pool is never shared between forked workers.
+    """
+    global _oidc_client
+    if _oidc_client is None:
+        _oidc_client = OidcClient(
+            ttl=float(config.get('oidc_metadata_ttl') or 3600),
+            timeout=float(config.get('oidc_timeout') or 5),
+        )
+    return _oidc_client
+
+
+class ResUsers(models.Model):
+    _inherit = "res.users"
+
+    @api.model
+    def auth_oauth(self, provider, params):
+        # The ID token is not handed to _auth_oauth_validate
+        return super(ResUsers, self.with_context(hbn_oauth_id_token=params.get('id_token'))).auth_oauth(provider, params)
+
+    @api.model
+    def _auth_oauth_validate(self, provider, access_token):
+        """ Verify the ID token locally when the provider publishes its keys, instead of
+            calling its validation endpoint. The ID token must have been issued with
+            ``access_token``.
+        """
+        id_token = self.env.context.get('hbn_oauth_id_token')
+        oauth_provider = self.env['auth.oauth.provider'].browse(provider)
+        if not id_token or not oauth_provider.oidc_discovery_url:
+            return super()._auth_oauth_validate(provider, access_token)
+
+        start = time.perf_counter()
+        try:
+            claims = _get_oidc_client().verify_id_token(
+                id_token, oauth_provider.oidc_discovery_url, oauth_provider.client_id,
+                access_token=access_token or '',
+            )
+        except OidcError as e:
+            _logger.info("OAuth2: ID token rejected for provider %s: %s", oauth_provider.name, e)
+            raise AccessDenied() from e
+        _logger.debug("OAuth2: ID token verified locally in %.3fs", time.perf_counter() - start)
+
+        validation = {}
+        if oauth_provider.data_endpoint:
+            validation.update(self._auth_oauth_rpc(oauth_provider.data_endpoint, access_token))
+        # the subject of the verified ID token prevails over any identifier of the user data
+        for key in ('sub', 'id', 'user_id'):
+            validation.pop(key, None)
+        validation.update(claims)
+        validation['user_id'] = validation.pop('sub')
+        return validation
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import secrets
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+SHORT_LINK_LIFETIME = timedelta(days=180)
+
+
+class ShortLink(models.Model):
+    """ Short link sent to customers, e.g. to their invoice.
+
+        The target URL is computed when the link is created, so that following a link is a
+        single lookup on the code. Hits are appended to ``hbn.short.link.hit`` and added to
+        the counters of the links in batches by a cron, so that following a link never
+        writes on the link itself.
+    """
+    _name = "hbn.short.link"
+    _description = "Short Link"
+
+    code = fields.Char(required=True, readonly=True, copy=False)
+    target_url = fields.Char(string="Target URL", required=True)
+    invoice_id = fields.Many2one('account.move', string="Invoice", ondelete='cascade', index='btree_not_null')
+    expiration_date = fields.Datetime(index=True)
+    hit_count = fields.Integer(string="Hits", readonly=True)
+    last_hit_date = fields.Datetime(readonly=True)
+
+    _sql_constraints = [
+        ('code_uniq', 'unique(code)', 'A short link code must be unique.'),
+    ]
+
+    @api.model
+    def _generate_code(self):
+        return secrets.token_urlsafe(8)
+
+    @api.model
+    def _get_invoice_link(self, invoice):
+        """ Return the link to the PDF of ``invoice``, created when it has none valid yet. """
+        now = fields.Datetime.now()
+        link = self.search([
+            ('invoice_id', '=', invoice.id),
+            '|', ('expiration_date', '=', False), ('expiration_date', '>', now),
+        ], order='id desc', limit=1)
+        if not link:
+            link = self.create({
+                'code': self._generate_code(),
+                'invoice_id': invoice.id,
+                'target_url': f"{invoice.get_portal_url()}&report_type=pdf&download=true",
+                'expiration_date': now + SHORT_LINK_LIFETIME,
+            })
+        return link
+
+    def _get_short_url(self):
+        self.ensure_one()
+        base_url = config.get("base_url", "https://hairbyning.com")
+        return f"{base_url}/l/{self.code}"
+
+    @api.model
+    def _resolve(self, code=None, invoice_id=None):
+        """ Return the valid link of ``code``, or the latest valid link of ``invoice_id``,
+            and count a hit on it.
+        """
+        domain = [('code', '=', code)] if code else [('invoice_id', '=', invoice_id)]
+        link = self.search(domain + [
+            '|', ('expiration_date', '=', False), ('expiration_date', '>', fields.Datetime.now()),
+        ], order='id desc', limit=1)
+        if link:
+            self.env['hbn.short.link.hit']._record(link)
+        return link
+
+    @api.model
+    def _cron_flush_hits(self):
+        """ Add the recorded hits to the counters of the links. """
+        self.env.cr.execute("""
+            WITH hits AS (
+                DELETE FROM hbn_short_link_hit
+                  RETURNING link_id, hit_date
+            )
+            UPDATE hbn_short_link AS link
+               SET hit_count = COALESCE(link.hit_count, 0) + counts.count,
+                   last_hit_date = GREATEST(link.last_hit_date, counts.last_hit_date)
+              FROM (SELECT link_id, COUNT(*) AS count, MAX(hit_date) AS last_hit_date
+                      FROM hits
+                  GROUP BY link_id) AS counts
+             WHERE link.id = counts.link_id
+        """)
+        _logger.info("Short links: hit counters of %s links updated", self.env.cr.rowcount)
+        self.invalidate_model(['hit_count', 'last_hit_date'])
+
+    @api.autovacuum
+    def _gc_expired_links(self):
+        self.search([('expiration_date', '<', fields.Datetime.now())]).unlink()
+
+
+class ShortLinkHit(models.Model):
+    """ Hit on a short link, not added to the counters of the link yet. """
+    _name = "hbn.short.link.hit"
+    _description = "Short Link Hit"
+    _log_access = False
+
+    link_id = fields.Many2one('hbn.short.link', required=True, ondelete='cascade')
+    hit_date = fields.Datetime(required=True)
+
+    @api.model
+    def _record(self, link):
+        """ Record a hit on ``link`` in the transaction of the request: an insert in this
+            append-only table, which never locks the link against concurrent hits.
+        """
+        self.env.cr.execute(
+            "INSERT INTO hbn_short_link_hit (link_id, hit_date) VALUES (%s, NOW() AT TIME ZONE 'UTC')",
+            (link.id,),
+        )
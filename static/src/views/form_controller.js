@@ -0,0 +1,44 @@
+/** @odoo-module */
+
+import { status } from "@odoo/owl";
+import { _t } from "@web/core/l10n/translation";
+import { rpc } from "@web/core/network/rpc";
+import { patch } from "@web/core/utils/patch";
+import { FormController } from "@web/views/form/form_controller";
+
+// Delay between two polls of the status of a deposit, and number of polls before giving up
+const DEPOSIT_POLL_DELAY = 2000;
+const DEPOSIT_POLL_LIMIT = 30;
+
+patch(FormController.prototype, {
+    async afterExecuteActionButton(clickParams) {
+        const result = await super.afterExecuteActionButton(...arguments);
+        if (this.props.resModel === "calendar.event" && clickParams.name === "action_make_deposit" && this.model.root.resId) {
+            // the deposit runs in the background: reload the booking once it is done
+            this.pollDepositStatus(this.model.root.resId);
+        }
+        return result;
+    },
+
+    async pollDepositStatus(eventId) {
+        for (let poll = 0; poll < DEPOSIT_POLL_LIMIT; poll++) {
+            await new Promise((resolve) => setTimeout(resolve, DEPOSIT_POLL_DELAY));
+            if (status(this) === "destroyed" || this.model.root.resId !== eventId) {
+                return;
+            }
+            const depositStatus = await rpc(`/hbn/appointment/deposit/status/${eventId}`);
+            if (depositStatus.state === "pending") {
+                continue;
+            }
+            if (depositStatus.state === "failed") {
+                this.env.services.notification.add(depositStatus.error || _t("The deposit of this booking failed."), {
+                    type: "danger",
+                });
+            }
+            if (status(this) !== "destroyed") {
+                await this.model.root.load();
+            }
+            return;
+        }
+    },
+});
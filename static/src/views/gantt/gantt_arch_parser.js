@@ -9,11 +9,16 @@ patch(GanttArchParser.prototype, {
 
         let slot_min_time;
         let slot_max_time;
+        let business_hours;
         visitXML(arch, (node) => {
             switch (node.tagName) {
                 case "gantt": {
                     slot_min_time = node.getAttribute('slot_min_time');
                     slot_max_time = node.getAttribute('slot_max_time');
+                    // Opening hours parsed by the server (ir.ui.view._postprocess_tag_gantt)
+                    if (node.hasAttribute('business_hours')) {
+                        business_hours = JSON.parse(node.getAttribute('business_hours'));
+                    }
                     break;
                 }
             }
@@ -23,6 +28,7 @@ patch(GanttArchParser.prototype, {
             ...archInfo,
             slotMinTime: slot_min_time,
             slotMaxTime: slot_max_time,
+            businessHours: business_hours,
         };
     }
 });
\ No newline at end of file
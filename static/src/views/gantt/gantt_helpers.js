@@ -1,46 +1,86 @@
-import { useService } from "@web/core/utils/hooks";
 import * as gantt_helpers from "@web_gantt/gantt_helpers";
-const { DateTime } = luxon;
 
 /** @typedef {luxon.DateTime} DateTime */
 
-export function diffColumn(col1, col2, unit, metaData) {
-        let result = 0;
-        const { slotMaxTime, slotMinTime } = metaData;
-        if(!slotMinTime || !slotMaxTime || unit != 'hour'){
-            result = gantt_helpers.diffColumn(col1, col2, unit);
-        } else {
-            const open = slotMinTime;
-            const close = slotMaxTime;
+// Memoized business-hours calendars, by "slotMinTime-slotMaxTime"
+const businessCalendars = new Map();
+// Memoized column differences of a calendar, cleared past this size
+const MAX_MEMOIZED_DIFFS = 10000;
+
+function parseTimeOfDay(value) {
+    const [hour, minute] = value.split(":").map((part) => parseInt(part, 10));
+    return { hour, minute: minute || 0 };
+}
+
+/**
+ * Return the business-hours calendar of the view, or null when the view shows full days.
+ *
+ * The business hours of every day are laid end to end: a date is mapped to its position in
+ * business hours since a reference day, so that columns are counted and placed with plain
+ * arithmetic instead of walking the range day by day. The opening hours are parsed once per view,
+ * by the server when the arch provides them in ``business_hours``.
+ *
+ * @param {Object} metaData
+ */
+export function getBusinessCalendar(metaData) {
+    const { slotMinTime, slotMaxTime } = metaData;
+    if (!slotMinTime || !slotMaxTime) {
+        return null;
+    }
+    const key = `${slotMinTime}-${slotMaxTime}`;
+    let calendar = businessCalendars.get(key);
+    if (!calendar) {
+        const { businessHours } = metaData;
+        const open = businessHours ? { hour: businessHours.open[0], minute: businessHours.open[1] } : parseTimeOfDay(slotMinTime);
+        const close = businessHours ? { hour: businessHours.close[0], minute: businessHours.close[1] } : parseTimeOfDay(slotMaxTime);
+        const hoursPerDay = close.hour + close.minute / 60 - (open.hour + open.minute / 60);
+        calendar = { open, close, hoursPerDay, diffs: new Map() };
+        businessCalendars.set(key, calendar);
+    }
+    return calendar.hoursPerDay > 0 ? calendar : null;
+}
 
-            let current = col1;
+function openingOf(date, calendar) {
+    return date.set({ ...calendar.open, second: 0, millisecond: 0 });
+}
 
-            while (current < col2) {
-                // If today is a business day
-                // Get start and end of business hours for today
-                const startDate = current.set({ 
-                    hour: parseInt(open.split(":")[0], 10), 
-                    minute: parseInt(open.split(":")[1], 10), 
-                    second: 0 
-                });
-                const stopDate = current.set({ 
-                    hour: parseInt(close.split(":")[0], 10), 
-                    minute: parseInt(close.split(":")[1], 10), 
-                    second: 0 
-                });
+function closingOf(date, calendar) {
+    return date.set({ ...calendar.close, second: 0, millisecond: 0 });
+}
 
-                // Find overlap with current day
-                const intervalStart = current > startDate ? current : startDate;
-                const intervalEnd = col2 < stopDate ? col2 : stopDate;
+/**
+ * Position of ``date`` in business hours since the day of ``reference``. Dates outside of the
+ * business hours are moved to the closest opening or closing; the closing of a day and the
+ * opening of the next one share the same position.
+ */
+function businessPosition(date, reference, calendar) {
+    const days = Math.round(date.startOf("day").diff(reference.startOf("day"), "days").days);
+    const offset = date.diff(openingOf(date, calendar), "hours").hours;
+    return days * calendar.hoursPerDay + Math.min(Math.max(offset, 0), calendar.hoursPerDay);
+}
 
-                if (intervalStart < intervalEnd) {
-                    result += intervalEnd.diff(intervalStart, unit).hours;
-                }
-                // Move to next day at midnight
-                current = current.plus({ days: 1 }).startOf('day');
-            }
+/** Inverse of ``businessPosition``: the date at ``position``, never at a closing time. */
+function businessDate(position, reference, calendar) {
+    const days = Math.floor(position / calendar.hoursPerDay);
+    const offset = position - days * calendar.hoursPerDay;
+    return openingOf(reference.startOf("day").plus({ days }), calendar).plus({ hours: offset });
+}
+
+export function diffColumn(col1, col2, unit, metaData) {
+    const calendar = getBusinessCalendar(metaData);
+    if (!calendar || unit != 'hour') {
+        return gantt_helpers.diffColumn(col1, col2, unit);
+    }
+    const key = `${col1.toMillis()}-${col2.toMillis()}`;
+    let result = calendar.diffs.get(key);
+    if (result === undefined) {
+        result = col1 < col2 ? businessPosition(col2, col1, calendar) - businessPosition(col1, col1, calendar) : 0;
+        if (calendar.diffs.size >= MAX_MEMOIZED_DIFFS) {
+            calendar.diffs.clear();
         }
-        return result;
+        calendar.diffs.set(key, result);
+    }
+    return result;
 }
 
 export function getRangeFromDate(rangeId, date, metaData) {
@@ -50,156 +90,37 @@ export function getRangeFromDate(rangeId, date, metaData) {
 }
 
 export function localStartOf(date, unit, metaData) {
-    let resultDate = gantt_helpers.localStartOf(date,unit);
-    const { slotMinTime, slotMaxTime, scale } = metaData;
-    if(slotMinTime && slotMaxTime && scale.interval === 'hour'){
-        resultDate =  resultDate.set({
-                            hour: parseInt(slotMinTime.split(":")[0], 10),  
-                            minute: parseInt(slotMinTime.split(":")[1], 10),
-                            second: 0,
-                            millisecond: 0, 
-                        });
+    const resultDate = gantt_helpers.localStartOf(date, unit);
+    const calendar = getBusinessCalendar(metaData);
+    if (calendar && metaData.scale.interval === 'hour') {
+        return openingOf(resultDate, calendar);
     }
     return resultDate;
 }
 
 export function localEndOf(date, unit, metaData) {
-    const { slotMinTime, slotMaxTime, scale } = metaData
-    let resultDate = gantt_helpers.localEndOf(date,unit);
-    if(slotMinTime && slotMaxTime && scale.interval === 'hour'){
-        resultDate = resultDate.set({
-                        hour: parseInt(slotMaxTime.split(":")[0], 10),  
-                        minute: parseInt(slotMaxTime.split(":")[1], 10),
-                        second: 0,
-                        millisecond: 0, 
-                        });
+    const resultDate = gantt_helpers.localEndOf(date, unit);
+    const calendar = getBusinessCalendar(metaData);
+    if (calendar && metaData.scale.interval === 'hour') {
+        return closingOf(resultDate, calendar);
     }
     return resultDate;
 }
 
 export function datePlus(startDate, intervalToAdd, interval='hour', metaData) {
-    const { slotMinTime, slotMaxTime } = metaData;
-    if(!slotMinTime || !slotMaxTime || interval !== 'hour'){
+    const calendar = getBusinessCalendar(metaData);
+    if (!calendar || interval !== 'hour') {
         return startDate.plus({[interval]: intervalToAdd});
-    } else {
-        const openTimeString = slotMinTime;
-        const closeTimeString = slotMaxTime;
-        const openDateTime = DateTime.fromFormat(openTimeString, 'HH:mm');
-        const closeDateTime = DateTime.fromFormat(closeTimeString, 'HH:mm');
-
-        let hoursRemaining = intervalToAdd;
-        let result = startDate;
-
-        while (hoursRemaining > 0) {
-            let currentHour = result.hour;
-            // If before business start, move to business start
-            if (currentHour < openDateTime.hour) {
-                result = result.set({
-                    hour: parseInt(openTimeString.split(":")[0], 10), 
-                    minute: parseInt(openTimeString.split(":")[1], 10), 
-                    second: 0, 
-                    millisecond: 0
-                });
-                currentHour = openDateTime.hour;
-            } else if (currentHour >= parseInt(close)) {
-                result = result.plus({days: 1}).set({
-                    hour: parseInt(openTimeString.split(":")[0], 10), 
-                    minute: parseInt(openTimeString.split(":")[1], 10), 
-                    second: 0, 
-                    millisecond: 0
-                });
-                continue;
-            }
-            // Remaining hours in today's business window
-            let hoursInDay = closeDateTime.hour - currentHour;
-            let useHours = Math.min(hoursInDay, hoursRemaining);
-            result = result.plus({hours: useHours});
-            hoursRemaining -= useHours;
-            // If we finished within today's window, return
-            if (hoursRemaining <= 0) break;
-
-            // Otherwise, move to next day at business start hour
-            result = result.plus({days: 1}).set({
-                hour: parseInt(openTimeString.split(":")[0], 10), 
-                minute: parseInt(openTimeString.split(":")[1], 10), 
-                millisecond: 0
-            });
-        }
-        if(result.hour == closeDateTime.hour){
-            result = result.plus({days: 1}).set({
-                hour: parseInt(openTimeString.split(":")[0], 10), 
-                minute: parseInt(openTimeString.split(":")[1], 10), 
-                millisecond: 0
-            });
-        }
-        return result;
     }
+    const position = businessPosition(startDate, startDate, calendar) + intervalToAdd;
+    return businessDate(position, startDate, calendar);
 }
 
 export function dateMinus(startDate, intervalToSubtract, interval='hour', metaData) {
-    const { slotMinTime, slotMaxTime } = metaData;
-    if(!slotMinTime || !slotMaxTime || interval !== 'hour'){
+    const calendar = getBusinessCalendar(metaData);
+    if (!calendar || interval !== 'hour') {
         return startDate.minus({[interval]: intervalToSubtract});
-    } else {
-        const openTimeString = slotMinTime;
-        const closeTimeString = slotMaxTime;
-        const openDateTime = DateTime.fromFormat(openTimeString, 'HH:mm');
-        const closeDateTime = DateTime.fromFormat(closeTimeString, 'HH:mm');
-
-        let hoursRemaining = intervalToSubtract;
-        let result = startDate;
-
-        while (hoursRemaining > 0) {
-            let currentHour = result.hour;
-            
-            // If at or after business close, move to previous day's business close
-            if (currentHour >= closeDateTime.hour) {
-                result = result.minus({days: 1}).set({
-                    hour: parseInt(closeTimeString.split(":")[0], 10), 
-                    minute: parseInt(closeTimeString.split(":")[1], 10), 
-                    second: 0, 
-                    millisecond: 0
-                });
-                currentHour = closeDateTime.hour;
-            } else if (currentHour < openDateTime.hour) {
-                // Already before open, but shouldn't happen in normal flow
-                result = result.minus({days: 1}).set({
-                    hour: parseInt(closeTimeString.split(":")[0], 10), 
-                    minute: parseInt(closeTimeString.split(":")[1], 10), 
-                    second: 0, 
-                    millisecond: 0
-                });
-                continue;
-            }
-            
-            // Remaining hours in today's business window (from open to current)
-            let hoursInDay = currentHour - openDateTime.hour;
-            let useHours = Math.min(hoursInDay, hoursRemaining);
-            result = result.minus({hours: useHours});
-            hoursRemaining -= useHours;
-            
-            // If we finished within today's window, return
-            if (hoursRemaining <= 0) break;
-
-            // Otherwise, move to previous day at business close hour
-            result = result.minus({days: 1}).set({
-                hour: parseInt(closeTimeString.split(":")[0], 10), 
-                minute: parseInt(closeTimeString.split(":")[1], 10), 
-                second: 0, 
-                millisecond: 0
-            });
-        }
-        
-        // Ensure we don't land exactly on business close time (move to previous day open)
-        if(result.hour >= closeDateTime.hour){
-            result = result.minus({days: 1}).set({
-                hour: parseInt(openTimeString.split(":")[0], 10), 
-                minute: parseInt(openTimeString.split(":")[1], 10), 
-                second: 0, 
-                millisecond: 0
-            });
-        }
-        
-        return result;
     }
+    const position = businessPosition(startDate, startDate, calendar) - intervalToSubtract;
+    return businessDate(position, startDate, calendar);
 }
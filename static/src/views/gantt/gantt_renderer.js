@@ -30,32 +30,32 @@ patch(AppointmentBookingGanttRenderer.prototype, {
         const { interval } = scale;
         super.computeDerivedParams();
         if (this.hideNonBusinessHours && interval === 'hour'){
-            let focusDate, groupBy;
-            let context = this.props.model.searchParams.context;
+            let metaData = this.metaData;
+            const context = this.props.model.searchParams.context;
             if (context.focusDate && context.groupBy) {
-                ({ focusDate, groupBy } = context);
-                const searchParams = {
-                    focusDate: localStartOf(DateTime.fromISO(focusDate), interval, this.metaData),
-                    groupBy: groupBy,
+                const focusDate = localStartOf(DateTime.fromISO(context.focusDate), interval, metaData);
+                // Only rebuild for a new focus: the range it gives is aligned on business hours below
+                if (!metaData.focusDate || !focusDate.equals(metaData.focusDate)) {
+                    await this.model._buildMetaData({ focusDate, groupBy: context.groupBy });
+                    metaData = this.metaData;
                 }
-                await this.model._buildMetaData(searchParams);
-            } 
-            const { globalStart, globalStop, startDate, stopDate } = this.metaData;
-            const globalStartDate = localStartOf(globalStart, interval, this.metaData);
-            const globalStopDate = localStartOf(globalStop, interval, this.metaData);
-
-            this.columnCount = diffColumn(globalStartDate, globalStopDate, interval, this.metaData);
+            }
+            const { globalStart, globalStop, startDate, stopDate } = metaData;
             const searchParams = {
-                globalStart: globalStartDate,
-                globalStop: globalStopDate,
-                startDate: localStartOf(startDate, interval, this.model.metaData),
-                stopDate: localStartOf(stopDate, interval, this.model.metaData)
+                globalStart: localStartOf(globalStart, interval, metaData),
+                globalStop: localStartOf(globalStop, interval, metaData),
+                startDate: localStartOf(startDate, interval, metaData),
+                stopDate: localStartOf(stopDate, interval, metaData),
+            };
+            this.columnCount = diffColumn(searchParams.globalStart, searchParams.globalStop, interval, metaData);
+            if (Object.entries(searchParams).some(([key, date]) => !metaData[key] || !date.equals(metaData[key]))) {
+                this.model._buildMetaData(searchParams);
             }
-            this.model._buildMetaData(searchParams)
         } 
     },
     computeVisibleColumns() {
-        const { scale } = this.metaData;
+        const metaData = this.metaData;
+        const { scale } = metaData;
         if(!this.hideNonBusinessHours || scale.interval != 'hour'){
             super.computeVisibleColumns();
         } else {
@@ -65,9 +65,9 @@ patch(AppointmentBookingGanttRenderer.prototype, {
             this.subColumns = [];
             this.coarseGridCols = {
                 1: true,
-                [this.columnCount * this.metaData.scale.cellPart + 1]: true,
+                [this.columnCount * metaData.scale.cellPart + 1]: true,
             };
-            const { globalStart, globalStop } = this.metaData;
+            const { globalStart, globalStop } = metaData;
             const { cellPart, interval, unit } = scale;
 
             const now = DateTime.local();
@@ -77,10 +77,10 @@ patch(AppointmentBookingGanttRenderer.prototype, {
 
             const groupsLeftBound = DateTime.max(
                 globalStart,
-                localStartOf(datePlus(globalStart, firstIndex, interval, this.metaData), unit, this.metaData)
+                localStartOf(datePlus(globalStart, firstIndex, interval, metaData), unit, metaData)
             );
             const groupsRightBound = DateTime.min(
-                localEndOf(datePlus(globalStart, lastIndex, interval, this.metaData), unit, this.metaData),
+                localEndOf(datePlus(globalStart, lastIndex, interval, metaData), unit, metaData),
                 globalStop
             );
             let currentGroup = null;
@@ -110,11 +110,11 @@ patch(AppointmentBookingGanttRenderer.prototype, {
                     this.coarseGridCols[col + i] = true;
                 }
 
-                const groupStart = localStartOf(start, unit, this.metaData);
+                const groupStart = localStartOf(start, unit, metaData);
                 if (!currentGroup || !groupStart.equals(currentGroup.start)) {
                     const groupId = `__group__${this.columnsGroups.length + 1}`;
                     const startingBound = DateTime.max(groupsLeftBound, groupStart);
-                    const endingBound = DateTime.min(groupsRightBound, localEndOf(groupStart, unit, this.metaData));
+                    const endingBound = DateTime.min(groupsRightBound, localEndOf(groupStart, unit, metaData));
                     const [groupFirstCol, groupLastCol] = this.getGridColumnFromDates(
                         startingBound,
                         endingBound
@@ -157,7 +157,7 @@ patch(AppointmentBookingGanttRenderer.prototype, {
         if(!this.hideNonBusinessHours || scale.interval !== 'hour' ){
             subColumn = super.getSubColumnFromColNumber(col);
         } else {
-            subColumn = this.mappingColToColumn.get(col);
+            subColumn = this.mappingColToSubColumn.get(col);
             if (!subColumn) {
                 const { globalStart } = this.metaData;
                 const { interval, cellPart, cellTime, time } = scale;
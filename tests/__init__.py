@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from . import test_turnstile
+from . import test_outbox
+from . import test_oidc
+from . import test_res_partner
+from . import test_calendar_event
+from . import test_deposit
+from . import test_idempotency_key
+from . import test_appointment_type
+from . import test_deposit_tier
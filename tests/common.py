@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from odoo import Command
+
+
+class StandInServer:
+    """ Local HTTP server standing in for a remote service in tests.
+
+        ``routes`` maps a path to a callable ``(method, params) -> (status, body)``;
+        a dict body is sent as JSON. Requests are recorded in ``requests`` as
+        ``(method, path, params)``.
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self, method):
+                path, _, query = self.path.partition('?')
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else query
+                params = {key: values[0] for key, values in parse_qs(body).items()}
+                server.requests.append((method, path, params))
+                route = server.routes.get(path)
+                status, payload = route(method, params) if route else (404, {})
+                data = json.dumps(payload).encode() if isinstance(payload, dict) else payload.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%s' % self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class BookingCommon:
+    """ Mixin of the test cases working on bookings: call ``_setup_booking_data`` from
+        ``setUpClass`` to get a service, three chairs and an appointment type booking them.
+    """
+
+    @classmethod
+    def _setup_booking_data(cls):
+        cls.service = cls.env['product.product'].create({
+            'name': 'Haircut',
+            'type': 'service',
+            'list_price': 400.0,
+        })
+        cls.chairs = cls.env['appointment.resource'].create([
+            {'name': f'Chair {index}', 'capacity': 1} for index in range(1, 4)
+        ])
+        cls.appointment_type = cls.env['appointment.type'].create({
+            'name': 'Salon',
+            'appointment_tz': 'UTC',
+            'schedule_based_on': 'resources',
+            'resource_ids': [Command.set(cls.chairs.ids)],
+        })
+        cls.customer = cls.env['res.partner'].create({'name': 'Customer', 'email': 'customer@example.com'})
+
+    @classmethod
+    def _create_booking(cls, start, chairs=None, hours=1, **values):
+        """ Create a booking of ``chairs`` (the first chair by default) from ``start``. """
+        chairs = cls.chairs[:1] if chairs is None else chairs
+        return cls.env['calendar.event'].with_context(
+            no_mail_to_attendees=True,
+            hbn_booking_lines_allocated=True,
+        ).create({
+            'name': 'Booking',
+            'appointment_type_id': cls.appointment_type.id,
+            'start': start,
+            'stop': start + timedelta(hours=hours),
+            'partner_ids': [Command.set(cls.customer.ids)],
+            'booking_line_ids': [Command.create({
+                'appointment_resource_id': chair.id,
+                'capacity_reserved': chair.capacity,
+                'product_variant_id': cls.service.id,
+            }) for chair in chairs],
+            **values,
+        })
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import Command
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import BookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestFormAnswers(BookingCommon, TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._setup_booking_data()
+        cls.q_hair, cls.q_service, cls.q_extras, cls.q_notes = cls.env['appointment.question'].create([{
+            'name': 'Hair length',
+            'question_type': 'select',
+            'appointment_type_id': cls.appointment_type.id,
+            'answer_ids': [Command.create({'name': 'Short'}), Command.create({'name': 'Long'})],
+        }, {
+            'name': 'Service',
+            'question_type': 'radio',
+            'appointment_type_id': cls.appointment_type.id,
+            'answer_ids': [Command.create({'name': 'Cut'}), Command.create({'name': 'Colour'})],
+        }, {
+            'name': 'Extras',
+            'question_type': 'checkbox',
+            'appointment_type_id': cls.appointment_type.id,
+            'answer_ids': [Command.create({'name': 'Wash'}), Command.create({'name': 'Massage'})],
+        }, {
+            'name': 'Notes',
+            'question_type': 'text',
+            'appointment_type_id': cls.appointment_type.id,
+        }])
+
+    def _answers(self, values):
+        return {(value['question_id'], value.get('value_answer_id'), value.get('value_text_box')) for value in values}
+
+    def test_valid_answers(self):
+        long_hair, wash = self.q_hair.answer_ids[1], self.q_extras.answer_ids[0]
+        values, errors = self.appointment_type._parse_form_answers({
+            f'question_{self.q_hair.id}': str(long_hair.id),
+            f'question_{self.q_extras.id}_answer_{wash.id}': 'on',
+            f'question_{self.q_notes.id}': '  Sensitive scalp  ',
+            f'question_{self.q_service.id}': '',
+            'name': 'Customer',
+        })
+        self.assertFalse(errors)
+        self.assertEqual(self._answers(values), {
+            (self.q_hair.id, long_hair.id, None),
+            (self.q_extras.id, wash.id, None),
+            (self.q_notes.id, None, 'Sensitive scalp'),
+        })
+        self.assertTrue(all(value['appointment_type_id'] == self.appointment_type.id for value in values))
+        self.assertFalse(any('partner_id' in value for value in values))
+
+    def test_invalid_answers(self):
+        values, errors = self.appointment_type._parse_form_answers({
+            # an answer of another question
+            f'question_{self.q_hair.id}': str(self.q_service.answer_ids[0].id),
+            f'question_{self.q_service.id}': 'Cut',
+            f'question_{self.q_notes.id}': 'Fine',
+        })
+        self.assertEqual(errors, {
+            f'question_{self.q_hair.id}': 'invalid-answer',
+            f'question_{self.q_service.id}': 'invalid-answer',
+        })
+        self.assertEqual(self._answers(values), {(self.q_notes.id, None, 'Fine')})
+
+    def test_unknown_inputs_ignored(self):
+        other_type = self.appointment_type.copy()
+        question = self.env['appointment.question'].create({
+            'name': 'Other', 'question_type': 'char', 'appointment_type_id': other_type.id,
+        })
+        values, errors = self.appointment_type._parse_form_answers({
+            f'question_{question.id}': 'Not asked here',
+            f'question_{self.q_extras.id}_answer_{self.q_hair.answer_ids[0].id}': 'on',
+        })
+        self.assertFalse(values)
+        self.assertFalse(errors)
+
+    def test_schema_follows_question_changes(self):
+        self.appointment_type._parse_form_answers({})
+        question = self.env['appointment.question'].create({
+            'name': 'Allergies', 'question_type': 'char', 'appointment_type_id': self.appointment_type.id,
+        })
+        values, _errors = self.appointment_type._parse_form_answers({f'question_{question.id}': 'None'})
+        self.assertEqual(self._answers(values), {(question.id, None, 'None')})
+
+        answer = self.q_hair.answer_ids[0]
+        answer.unlink()
+        _values, errors = self.appointment_type._parse_form_answers({f'question_{self.q_hair.id}': str(answer.id)})
+        self.assertEqual(errors, {f'question_{self.q_hair.id}': 'invalid-answer'})
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import datetime, timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import BookingCommon
+
+START = datetime(2026, 10, 20, 10, 0)
+
+
+@tagged('post_install', '-at_install')
+class TestAssignChairs(BookingCommon, TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._setup_booking_data()
+
+    def _vals(self, start, hours=1, capacity=None):
+        vals = {
+            'appointment_type_id': self.appointment_type.id,
+            'start': fields.Datetime.to_string(start),
+            'stop': fields.Datetime.to_string(start + timedelta(hours=hours)),
+        }
+        if capacity:
+            vals['resource_total_capacity_reserved'] = capacity
+        return vals
+
+    def _assigned(self, vals):
+        return [command[1] for command in vals['resource_ids']]
+
+    def test_first_free_chair(self):
+        vals = self._vals(START)
+        self.env['calendar.event']._assign_chairs([vals])
+        self.assertEqual(self._assigned(vals), self.chairs[:1].ids)
+
+    def test_busy_chair_skipped(self):
+        self._create_booking(START - timedelta(minutes=30))
+        vals = self._vals(START)
+        self.env['calendar.event']._assign_chairs([vals])
+        self.assertEqual(self._assigned(vals), self.chairs[1:2].ids)
+
+    def test_inactive_booking_does_not_block(self):
+        self._create_booking(START).active = False
+        vals = self._vals(START)
+        self.env['calendar.event']._assign_chairs([vals])
+        self.assertEqual(self._assigned(vals), self.chairs[:1].ids)
+
+    def test_batch_packs_intervals(self):
+        # the chairs given to a booking of the batch are busy for the following ones,
+        # a booking starting when another one ends can reuse its chair
+        first = self._vals(START)
+        overlapping = self._vals(START + timedelta(minutes=30))
+        adjacent = self._vals(START + timedelta(hours=1))
+        self.env['calendar.event']._assign_chairs([first, overlapping, adjacent])
+        self.assertEqual(self._assigned(first), self.chairs[0:1].ids)
+        self.assertEqual(self._assigned(overlapping), self.chairs[1:2].ids)
+        self.assertEqual(self._assigned(adjacent), self.chairs[0:1].ids)
+
+    def test_capacity_takes_several_chairs(self):
+        self._create_booking(START, chairs=self.chairs[1:2])
+        vals = self._vals(START, capacity=2)
+        self.env['calendar.event']._assign_chairs([vals])
+        self.assertEqual(self._assigned(vals), (self.chairs[0] | self.chairs[2]).ids)
+
+    def test_no_free_chair(self):
+        self._create_booking(START, chairs=self.chairs)
+        with self.assertRaises(ValidationError):
+            self.env['calendar.event']._assign_chairs([self._vals(START)])
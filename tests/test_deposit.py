@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.tests.common import tagged
+
+from .common import BookingCommon
+
+START = datetime(2026, 10, 20, 10, 0)
+
+
+@tagged('post_install', '-at_install')
+class TestDeposits(BookingCommon, AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._setup_booking_data()
+
+    def _create_bookings(self, count):
+        Event = self.env['calendar.event']
+        return Event.union(*(
+            self._create_booking(START + timedelta(hours=index)) for index in range(count)
+        ))
+
+    def _assert_deposit_made(self, event):
+        order = event.sale_order_id
+        self.assertEqual(order.state, 'sale')
+        dp_invoice = order.invoice_ids.filtered(lambda invoice: invoice.state == 'posted')
+        self.assertEqual(len(dp_invoice), 1)
+        self.assertAlmostEqual(dp_invoice.amount_total, event.deposit_amount)
+        self.assertIn(dp_invoice.payment_state, ('paid', 'in_payment'))
+        final_invoice = order.invoice_ids - dp_invoice
+        self.assertEqual(final_invoice.state, 'draft')
+        self.assertEqual(event.appointment_status, 'booked')
+
+    def test_make_deposits(self):
+        events = self._create_bookings(3)
+        self.assertEqual(events.mapped('deposit_amount'), [150, 150, 150])
+        results = events._make_deposits()
+
+        self.assertEqual({result['status'] for result in results.values()}, {'done'})
+        self.assertEqual(len(events.sale_order_id), 3, "each booking has its own order")
+        for event in events:
+            self._assert_deposit_made(event)
+            self.assertEqual(results[event.id]['sale_order_id'], event.sale_order_id.id)
+
+    def test_make_deposits_skips_ordered_bookings(self):
+        events = self._create_bookings(2)
+        order = events[0]._deposit_create_order()
+        results = events._make_deposits()
+
+        self.assertEqual(results[events[0].id], {'status': 'skipped', 'sale_order_id': order.id})
+        self.assertEqual(events[0].sale_order_id, order)
+        self.assertFalse(order.invoice_ids)
+        self.assertEqual(results[events[1].id]['status'], 'done')
+
+    def test_jobs_run_in_batch(self):
+        events = self._create_bookings(2)
+        jobs = self.env['hbn.deposit.job']._enqueue(events)
+        self.env['hbn.deposit.job']._cron_process()
+
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+        for job in jobs:
+            self.assertEqual(job.sale_order_id, job.event_id.sale_order_id)
+            self._assert_deposit_made(job.event_id)
+
+    def test_jobs_skipped_by_batch_run_stage_by_stage(self):
+        events = self._create_bookings(2)
+        jobs = self.env['hbn.deposit.job']._enqueue(events)
+        # the order of the first booking is made by hand before the runner picks the jobs up
+        order = events[0]._deposit_create_order()
+        self.env['hbn.deposit.job']._cron_process()
+
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+        self.assertEqual(jobs[0].sale_order_id, order)
+        self.assertTrue(jobs[0].deposit_invoice_id, "the skipped booking still gets its deposit")
+        self._assert_deposit_made(events[0])
+
+    def test_failed_batch_falls_back_to_stages(self):
+        events = self._create_bookings(2)
+        jobs = self.env['hbn.deposit.job']._enqueue(events)
+        with patch.object(type(self.env['calendar.event']), '_make_deposits', side_effect=ValueError("batch down")):
+            self.env['hbn.deposit.job']._cron_process()
+
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+        for event in events:
+            self._assert_deposit_made(event)
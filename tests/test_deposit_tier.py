@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import datetime
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import BookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestDepositTier(BookingCommon, TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['hbn.deposit.tier'].search([]).unlink()
+        cls.tiers = cls.env['hbn.deposit.tier'].create([
+            {'max_price': 0.0, 'amount': 0},
+            {'max_price': 500.0, 'amount': 150},
+            {'open_ended': True, 'amount': 300},
+        ])
+        cls._setup_booking_data()
+
+    def test_get_deposit(self):
+        DepositTier = self.env['hbn.deposit.tier']
+        self.assertEqual(DepositTier._get_deposit(0.0), 0, "a tier up to 0 is not open-ended")
+        self.assertEqual(DepositTier._get_deposit(0.01), 150)
+        self.assertEqual(DepositTier._get_deposit(500.0), 150)
+        self.assertEqual(DepositTier._get_deposit(500.01), 300)
+
+    def test_no_open_ended_tier(self):
+        self.tiers[2].unlink()
+        self.assertEqual(self.env['hbn.deposit.tier']._get_deposit(1000.0), 0)
+
+    def test_service_deposit_follows_tiers(self):
+        self.assertEqual(self.service.booking_deposit_amount, 150)
+        self.tiers[1].amount = 200
+        self.assertEqual(self.service.booking_deposit_amount, 200)
+        self.service.lst_price = 800.0
+        self.assertEqual(self.service.booking_deposit_amount, 300)
+
+    def test_booking_deposit_frozen_by_its_order(self):
+        event = self._create_booking(datetime(2026, 10, 20, 10, 0))
+        self.assertEqual(event.deposit_amount, 150)
+        event.sale_order_id = self.env['sale.order'].create({'partner_id': self.customer.id})
+        self.tiers[1].amount = 200
+        self.assertEqual(event.deposit_amount, 150)
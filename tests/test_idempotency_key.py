@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+from odoo.tests.common import HttpCase, TransactionCase, tagged
+
+from ..controllers.appointment import HairByNingAppointmentController
+
+SCOPE = 'appointment_submit:partner:1'
+
+
+@tagged('post_install', '-at_install')
+class TestIdempotencyKey(TransactionCase):
+
+    def test_claim_store_replay(self):
+        IdempotencyKey = self.env['hbn.idempotency.key']
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (True, None))
+        # the original request is still being processed
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (False, None))
+
+        stored = IdempotencyKey._store(SCOPE, 'key', {'status': 200, 'data': {'date': datetime(2026, 10, 20, 10, 0)}})
+        self.assertEqual(stored, {'status': 200, 'data': {'date': '2026-10-20 10:00:00'}})
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (False, stored))
+
+    def test_keys_are_scoped(self):
+        IdempotencyKey = self.env['hbn.idempotency.key']
+        IdempotencyKey._claim(SCOPE, 'key')
+        IdempotencyKey._store(SCOPE, 'key', {'status': 200})
+        self.assertEqual(IdempotencyKey._claim('appointment_submit:partner:2', 'key'), (True, None))
+
+    def test_release(self):
+        IdempotencyKey = self.env['hbn.idempotency.key']
+        IdempotencyKey._claim(SCOPE, 'key')
+        IdempotencyKey._release(SCOPE, 'key')
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (True, None))
+
+    def test_expired_key_claimed_again(self):
+        IdempotencyKey = self.env['hbn.idempotency.key']
+        IdempotencyKey._claim(SCOPE, 'key')
+        IdempotencyKey._store(SCOPE, 'key', {'status': 200})
+        self.env.cr.execute(
+            "UPDATE hbn_idempotency_key SET expiration_date = %s WHERE scope = %s AND key = %s",
+            (datetime(2020, 1, 1), SCOPE, 'key'),
+        )
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (True, None))
+        self.assertEqual(IdempotencyKey._claim(SCOPE, 'key'), (False, None))
+
+
+@tagged('post_install', '-at_install')
+class TestSubmitIdempotency(HttpCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate('admin', 'admin')
+        self.scope = f"appointment_submit:partner:{self.env.ref('base.user_admin').partner_id.id}"
+        self.responses = []
+        self.calls = 0
+
+        def submit(controller, **kwargs):
+            self.calls += 1
+            return self.responses.pop(0)
+
+        patcher = patch.object(HairByNingAppointmentController, '_json_appointment_form_submit', autospec=True, side_effect=submit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _submit(self, key):
+        response = self.url_open('/hbn/appointment/submit', data=json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {'idempotency_key': key},
+        }), headers={'Content-Type': 'application/json'})
+        return response.json()
+
+    def test_retry_replays_the_booking(self):
+        self.responses = [{'status': 200, 'data': {'booking_id': 'B0001'}}]
+        first = self._submit('retry')
+        second = self._submit('retry')
+        self.assertEqual(first['result'], {'status': 200, 'data': {'booking_id': 'B0001'}})
+        self.assertEqual(second['result'], first['result'])
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_submission_runs_again(self):
+        self.responses = [
+            {'status': 'error', 'message': 'Verification failed', 'errors': []},
+            {'status': 200, 'data': {'booking_id': 'B0002'}},
+        ]
+        self.assertEqual(self._submit('failed')['result']['status'], 'error')
+        self.assertEqual(self._submit('failed')['result']['status'], 200)
+        self.assertEqual(self.calls, 2)
+
+    def test_concurrent_duplicate_conflicts(self):
+        # a request holding the key, still being processed
+        self.env['hbn.idempotency.key'].sudo()._claim(self.scope, 'in-flight')
+        response = self._submit('in-flight')
+        self.assertEqual(response['error']['data']['name'], 'werkzeug.exceptions.Conflict')
+        self.assertEqual(self.calls, 0)
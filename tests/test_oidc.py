@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from odoo.tests.common import BaseCase, tagged
+
+from ..tools import OidcClient, OidcError
+from .common import StandInServer
+
+AUDIENCE = 'hbn-client'
+ACCESS_TOKEN = 'jHkWEdUXMU1BwAsC4vtUsZwnNvTIxEl0z9K3vx5KF0Y'
+# at_hash of ACCESS_TOKEN with RS256, from the example of the OpenID Connect specification
+ACCESS_TOKEN_HASH = '77QmUPtjPfzWtF2AnpK9RQ'
+
+
+@tagged('post_install', '-at_install')
+class TestOidcClient(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.keys = {'key-1': rsa.generate_private_key(public_exponent=65537, key_size=2048)}
+        self.server = StandInServer({
+            '/.well-known/openid-configuration': lambda method, params: (200, {
+                'issuer': self.server.url,
+                'jwks_uri': self.server.url + '/jwks',
+                'id_token_signing_alg_values_supported': ['RS256'],
+            }),
+            '/jwks': lambda method, params: (200, {'keys': [
+                dict(json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key())), kid=kid, use='sig')
+                for kid, key in self.keys.items()
+            ]}),
+        })
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.discovery_url = self.server.url + '/.well-known/openid-configuration'
+        self.client = OidcClient()
+
+    def _id_token(self, kid='key-1', key=None, **claims):
+        now = int(time.time())
+        claims = {
+            'iss': self.server.url,
+            'aud': AUDIENCE,
+            'sub': 'user-42',
+            'iat': now,
+            'exp': now + 300,
+            'at_hash': ACCESS_TOKEN_HASH,
+            **claims,
+        }
+        return jwt.encode(claims, key or self.keys[kid], algorithm='RS256', headers={'kid': kid})
+
+    def _verify(self, id_token, access_token=ACCESS_TOKEN):
+        return self.client.verify_id_token(id_token, self.discovery_url, AUDIENCE, access_token=access_token)
+
+    def test_verify_id_token(self):
+        claims = self._verify(self._id_token())
+        self.assertEqual(claims['sub'], 'user-42')
+
+        # the metadata is cached: verifying another token makes no call to the provider
+        self._verify(self._id_token(sub='user-43'))
+        self.assertEqual([path for method, path, params in self.server.requests],
+                         ['/.well-known/openid-configuration', '/jwks'])
+
+    def test_access_token_binding(self):
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(), access_token='another-access-token')
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(at_hash=None))
+
+    def test_invalid_claims(self):
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(aud='another-client'))
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(iss='https://attacker.example.com'))
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(exp=int(time.time()) - 3600))
+
+    def test_invalid_signature(self):
+        self._verify(self._id_token())
+        forged_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(key=forged_key))
+        with self.assertRaises(OidcError):
+            self._verify(jwt.encode({'sub': 'user-42', 'aud': AUDIENCE}, 'secret', algorithm='HS256'))
+
+    def test_key_rotation(self):
+        self._verify(self._id_token())
+        self.keys['key-2'] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+        # an unknown key id refreshes the key set once
+        self._verify(self._id_token(kid='key-2'))
+        self.assertEqual([path for method, path, params in self.server.requests].count('/jwks'), 2)
+
+        # and not again right after, whatever the key id
+        with self.assertRaises(OidcError):
+            self._verify(self._id_token(kid='key-3', key=self.keys['key-2']))
+        self.assertEqual([path for method, path, params in self.server.requests].count('/jwks'), 2)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import datetime, timedelta
+
+from odoo import Command
+from odoo.tests.common import TransactionCase, tagged
+
+from ..tools import LocalTransport
+
+CHANNEL = 'checkout_confirmation'
+BATCH_CHANNEL = 'conversion'
+
+
+class ChatterTransport(LocalTransport):
+    """ Local transport posting on the booking before sending, like the attendee notifications. """
+
+    def send(self, channel, messages):
+        for message in messages:
+            message.event_id.message_post(body=f'notified {message.attendee_id.id}')
+        super().send(channel, messages)
+
+
+@tagged('post_install', '-at_install')
+class TestOutbox(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        partners = cls.env['res.partner'].create([
+            {'name': f'Customer {index}', 'email': f'customer{index}@example.com'} for index in range(3)
+        ])
+        start = datetime(2026, 10, 20, 10, 0)
+        cls.event = cls.env['calendar.event'].with_context(no_mail_to_attendees=True).create({
+            'name': 'Booking',
+            'start': start,
+            'stop': start + timedelta(hours=1),
+            'partner_ids': [Command.set(partners.ids)],
+        })
+        cls.attendees = cls.event.attendee_ids.sorted('id')
+
+    def _enqueue(self, channel=CHANNEL):
+        messages = self.env['hbn.outbox.message']._enqueue(channel, self.attendees)
+        messages.write({'next_attempt_date': datetime(2020, 1, 1)})
+        return messages
+
+    def test_batch_sent_in_one_call(self):
+        messages = self._enqueue(BATCH_CHANNEL)
+        transport = LocalTransport()
+        self.env['hbn.outbox.message']._cron_process(transport=transport)
+
+        self.assertEqual(transport.calls, [(BATCH_CHANNEL, 3)])
+        self.assertEqual([sent[1] for sent in transport.sent], self.attendees.ids)
+        self.assertEqual(set(messages.mapped('state')), {'sent'})
+
+    def test_partial_failure_does_not_resend_acknowledged_messages(self):
+        messages = self._enqueue(BATCH_CHANNEL)
+        transport = LocalTransport(fail_attendee_ids=[messages[1].attendee_id.id])
+        self.env['hbn.outbox.message']._cron_process(transport=transport)
+
+        # the batch stopped on the second message, which is then retried alone with the third one
+        self.assertEqual(transport.calls, [(BATCH_CHANNEL, 3), (BATCH_CHANNEL, 1), (BATCH_CHANNEL, 1)])
+        self.assertEqual([sent[1] for sent in transport.sent], (messages[0] | messages[2]).attendee_id.ids)
+        self.assertEqual(messages.mapped('state'), ['sent', 'pending', 'sent'])
+        self.assertEqual(messages.mapped('attempts'), [0, 1, 0])
+        self.assertGreater(messages[1].next_attempt_date, datetime(2020, 1, 1))
+
+    def test_failure_keeps_side_effects_of_messages_sent(self):
+        messages = self._enqueue()
+        transport = ChatterTransport(fail_attendee_ids=[messages[1].attendee_id.id])
+        self.env['hbn.outbox.message']._cron_process(transport=transport)
+
+        self.assertEqual(transport.calls, [(CHANNEL, 1), (CHANNEL, 1), (CHANNEL, 1)])
+        self.assertEqual(messages.mapped('state'), ['sent', 'pending', 'sent'])
+        bodies = ' '.join(self.event.message_ids.mapped('body'))
+        self.assertIn(f'notified {messages[0].attendee_id.id}', bodies)
+        self.assertNotIn(f'notified {messages[1].attendee_id.id}', bodies)
+        self.assertIn(f'notified {messages[2].attendee_id.id}', bodies)
+
+    def test_channel_down(self):
+        messages = self._enqueue()
+        transport = LocalTransport(fail_channels=[CHANNEL])
+        self.env['hbn.outbox.message']._cron_process(transport=transport)
+
+        self.assertEqual(transport.calls, [(CHANNEL, 1), (CHANNEL, 1), (CHANNEL, 1)])
+        self.assertFalse(transport.sent)
+        self.assertEqual(set(messages.mapped('state')), {'pending'})
+        self.assertEqual(messages.mapped('attempts'), [1, 1, 1])
+
+    def test_unique_channel_never_queued_twice(self):
+        Outbox = self.env['hbn.outbox.message']
+        messages = Outbox._enqueue(BATCH_CHANNEL, self.attendees)
+        self.assertEqual(messages.attendee_id, self.attendees)
+        self.assertFalse(Outbox._enqueue(BATCH_CHANNEL, self.attendees))
+
+        # sent messages of the unique channels are kept, so they are still skipped afterwards
+        messages.write({'state': 'sent', 'sent_date': datetime(2020, 1, 1)})
+        Outbox._gc_sent_messages()
+        self.assertTrue(messages.exists())
+        self.assertFalse(Outbox._enqueue(BATCH_CHANNEL, self.attendees))
+
+        # a failed message can be queued again
+        messages[0].state = 'failed'
+        self.assertEqual(Outbox._enqueue(BATCH_CHANNEL, self.attendees).attendee_id, messages[0].attendee_id)
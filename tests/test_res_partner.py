@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestFindByPhone(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Partner = cls.env['res.partner']
+        cls.belgium = cls.env.ref('base.be')
+        cls.with_email = cls.Partner.create({
+            'name': 'Jane Doe', 'phone': '+32 470 12 34 56', 'email': 'jane@example.com',
+        })
+        cls.without_email = cls.Partner.create({
+            'name': 'John  Smith', 'phone': '+32 470 65 43 21',
+        })
+
+    def test_phone_and_email(self):
+        self.assertEqual(self.Partner._find_by_phone('0470123456', 'Jane@Example.com', self.belgium), self.with_email)
+        self.assertFalse(self.Partner._find_by_phone('0470123456', 'other@example.com', self.belgium))
+
+    def test_phone_and_name_without_email(self):
+        self.assertEqual(self.Partner._find_by_phone('0470654321', False, self.belgium, name=' john smith'), self.without_email)
+        self.assertFalse(self.Partner._find_by_phone('0470654321', False, self.belgium, name='Jane Smith'))
+
+    def test_phone_alone(self):
+        self.assertFalse(self.Partner._find_by_phone('0470654321', False, self.belgium))
+
+    def test_internal_users_never_matched(self):
+        user = self.env['res.users'].create({
+            'name': 'Staff', 'login': 'staff@example.com', 'email': 'staff@example.com',
+            'groups_id': [(6, 0, [self.env.ref('base.group_user').id])],
+        })
+        user.partner_id.phone = '+32 470 11 11 11'
+        self.assertFalse(self.Partner._find_by_phone('0470111111', 'staff@example.com', self.belgium))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo.tests.common import BaseCase, tagged
+
+from ..tools import TurnstileClient
+from .common import StandInServer
+
+
+@tagged('post_install', '-at_install')
+class TestTurnstileClient(BaseCase):
+
+    def _siteverify(self, method, params):
+        if params.get('response') == 'broken':
+            return 500, 'oops'
+        return 200, {'success': params.get('response') == 'valid', 'error-codes': []}
+
+    def test_verify_caches_verdicts(self):
+        with StandInServer({'/siteverify': self._siteverify}) as server:
+            client = TurnstileClient(url=server.url + '/siteverify')
+            self.assertTrue(client.verify('secret', 'valid')['success'])
+            self.assertTrue(client.verify('secret', 'valid')['success'])
+            self.assertFalse(client.verify('secret', 'invalid')['success'])
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.requests[0][2], {'secret': 'secret', 'response': 'valid'})
+        metrics = client.get_metrics()
+        self.assertEqual(metrics['calls'], 2)
+        self.assertEqual(metrics['cache_hits'], 1)
+
+    def test_verify_concurrent_cache_hits(self):
+        with StandInServer({'/siteverify': self._siteverify}) as server:
+            client = TurnstileClient(url=server.url + '/siteverify')
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                verdicts = list(executor.map(lambda _: client.verify('secret', 'valid'), range(32)))
+
+        self.assertTrue(all(verdict['success'] for verdict in verdicts))
+        metrics = client.get_metrics()
+        self.assertEqual(metrics['calls'], len(server.requests))
+        self.assertEqual(metrics['calls'] + metrics['cache_hits'], 32)
+
+    def test_circuit_breaker(self):
+        with StandInServer({'/siteverify': self._siteverify}) as server:
+            client = TurnstileClient(url=server.url + '/siteverify', failure_threshold=2, reset_timeout=60)
+            for _ in range(3):
+                self.assertEqual(client.verify('secret', 'broken')['error-codes'], ['internal-error'])
+            self.assertEqual(client.verify('secret', 'valid')['error-codes'], ['internal-error'])
+
+        # the circuit opened after two failures: the endpoint was not called again
+        self.assertEqual(len(server.requests), 2)
+        metrics = client.get_metrics()
+        self.assertTrue(metrics['circuit_open'])
+        self.assertEqual(metrics['errors'], 2)
+        self.assertEqual(metrics['short_circuits'], 2)
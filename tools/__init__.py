@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from .cache import SharedCache
+from .turnstile import TurnstileClient, TURNSTILE_VERIFY_URL
+from .outbox import BatchMetrics, LocalTransport, OutboxSendError
+from .business_hours import opening_windows, parse_time_of_day
+from .oidc import OidcClient, OidcError
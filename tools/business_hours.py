@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import datetime, time, timedelta
+
+import pytz
+
+
+def parse_time_of_day(value):
+    """ Parse a ``HH:MM`` or ``HH:MM:SS`` time of day, as given to the ``slot_min_time`` and
+        ``slot_max_time`` attributes of the Gantt view.
+
+        :rtype: datetime.time
+        :raise ValueError: when ``value`` is not a valid time of day
+    """
+    parts = value.strip().split(':')
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"invalid time of day {value!r}")
+    return time(*map(int, parts))
+
+
+def opening_windows(start, stop, timezone, open_time=None, close_time=None):
+    """ Yield the opening windows (start, stop) overlapping [start, stop], as naive UTC datetimes.
+
+        The shop opens every day from ``open_time`` to ``close_time`` in ``timezone``; without
+        both of them, or when they do not make a valid range, it is open all day long.
+
+        :param datetime start: naive UTC datetime
+        :param datetime stop: naive UTC datetime
+        :param str timezone: name of the timezone of the opening hours
+    """
+    if not open_time or not close_time or close_time <= open_time:
+        yield start, stop
+        return
+    tz = pytz.timezone(timezone or 'UTC')
+    day = pytz.utc.localize(start).astimezone(tz).date() - timedelta(days=1)
+    last_day = pytz.utc.localize(stop).astimezone(tz).date() + timedelta(days=1)
+    while day <= last_day:
+        window_start = tz.localize(datetime.combine(day, open_time)).astimezone(pytz.utc).replace(tzinfo=None)
+        window_stop = tz.localize(datetime.combine(day, close_time)).astimezone(pytz.utc).replace(tzinfo=None)
+        window_start, window_stop = max(window_start, start), min(window_stop, stop)
+        if window_start < window_stop:
+            yield window_start, window_stop
+        day += timedelta(days=1)
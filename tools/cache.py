@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """ A computation in progress, shared by every caller asking for the same key. """
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """ Thread-safe, size-bounded LRU cache living in the worker process.
+
+        Entries may expire after ``ttl`` seconds. ``get_or_compute`` makes sure that
+        concurrent callers asking for the same missing key wait for a single
+        computation instead of running it once each.
+
+        :param int maxsize: maximum number of entries kept, least recently used first out
+        :param float ttl: default time to live of an entry in seconds, ``None`` for no expiry
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _expiry(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl else None
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, self._expiry(ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def discard_if(self, predicate):
+        """ Drop every entry whose key satisfies ``predicate(key)``.
+
+            :return: the number of entries dropped
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """ Return the cached value of ``key``, computing it with ``compute()`` when missing.
+
+            Only one caller computes a missing key, the others block until its value
+            (or its exception) is available. Exceptions are not cached.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+import jwt
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import SharedCache
+
+_logger = logging.getLogger(__name__)
+
+# Minimum delay between two refreshes of a key set for an unknown key id, in seconds
+OIDC_JWKS_REFRESH_DELAY = 60
+# Signature algorithms accepted for ID tokens, never 'none' nor shared secrets
+OIDC_ALGORITHMS = ['RS256', 'RS384', 'RS512', 'ES256', 'ES384', 'ES512', 'PS256', 'PS384', 'PS512']
+# Hash function of the at_hash claim, by signature algorithm
+OIDC_HASHES = {'256': 'sha256', '384': 'sha384', '512': 'sha512'}
+
+
+class OidcError(Exception):
+    """ An ID token could not be verified. """
+
+
+class OidcClient:
+    """ OpenID Connect client verifying ID tokens locally.
+
+        * discovery documents and JWKS are fetched through a pooled session and cached for
+          ``ttl`` seconds, so that verifying a token usually makes no outbound call;
+        * an unknown key id refreshes the JWKS once, to follow key rotations;
+        * the token is bound to the access token it comes with through its ``at_hash`` claim,
+          so that it cannot be replayed with another access token;
+        * the discovery URL may point to a local stand-in identity provider.
+
+        :param float ttl: lifetime of the cached discovery documents and key sets, in seconds
+        :param float timeout: connect and read timeout of a metadata call, in seconds
+        :param float leeway: tolerated clock skew when checking the token dates, in seconds
+    """
+
+    def __init__(self, ttl=3600, timeout=5.0, leeway=30, pool_size=4):
+        self.timeout = timeout
+        self.leeway = leeway
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.metadata = SharedCache(maxsize=64, ttl=ttl)
+        self._jwks_refreshed_at = {}
+
+    def get_discovery(self, discovery_url):
+        """ Return the discovery document published at ``discovery_url``. """
+        return self.metadata.get_or_compute(('discovery', discovery_url), lambda: self._fetch(discovery_url))
+
+    def get_jwks(self, jwks_uri, refresh=False):
+        """ Return the key set published at ``jwks_uri``, fetched again when ``refresh``
+            (at most once every ``OIDC_JWKS_REFRESH_DELAY`` seconds).
+        """
+        if refresh and time.monotonic() - self._jwks_refreshed_at.get(jwks_uri, float('-inf')) >= OIDC_JWKS_REFRESH_DELAY:
+            self._jwks_refreshed_at[jwks_uri] = time.monotonic()
+            self.metadata.pop(('jwks', jwks_uri))
+        return self.metadata.get_or_compute(('jwks', jwks_uri), lambda: self._fetch(jwks_uri))
+
+    def verify_id_token(self, id_token, discovery_url, audience, access_token=None):
+        """ Verify the signature, issuer, audience and dates of ``id_token``, and that it was
+            issued with ``access_token`` when given.
+
+            :return: the claims of the token
+            :raise OidcError: when the token is not valid
+        """
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise OidcError(f"malformed ID token: {e}") from e
+        algorithm = header.get('alg')
+        if algorithm not in OIDC_ALGORITHMS:
+            raise OidcError(f"unsupported ID token algorithm {algorithm!r}")
+
+        discovery = self.get_discovery(discovery_url)
+        supported = discovery.get('id_token_signing_alg_values_supported')
+        if supported and algorithm not in supported:
+            raise OidcError(f"algorithm {algorithm!r} not announced by the provider")
+        key = self._get_signing_key(discovery['jwks_uri'], header.get('kid'))
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key=key,
+                algorithms=[algorithm],
+                audience=audience,
+                issuer=discovery.get('issuer'),
+                leeway=self.leeway,
+                options={'require': ['exp', 'iat', 'sub']},
+            )
+        except jwt.PyJWTError as e:
+            raise OidcError(f"invalid ID token: {e}") from e
+        if access_token is not None:
+            expected = self._get_access_token_hash(access_token, algorithm)
+            if not hmac.compare_digest(str(claims.get('at_hash', '')), expected):
+                raise OidcError("ID token not issued with this access token")
+        return claims
+
+    def _get_access_token_hash(self, access_token, algorithm):
+        """ Return the ``at_hash`` of ``access_token``: the left half of its hash with the hash
+            function of the signature algorithm, base64url-encoded.
+        """
+        digest = hashlib.new(OIDC_HASHES[algorithm[2:]], access_token.encode()).digest()
+        return base64.urlsafe_b64encode(digest[:len(digest) // 2]).rstrip(b'=').decode()
+
+    def _get_signing_key(self, jwks_uri, kid):
+        for refresh in (False, True):
+            keys = self.get_jwks(jwks_uri, refresh=refresh).get('keys', [])
+            for key in keys:
+                if kid is None or key.get('kid') == kid:
+                    try:
+                        return jwt.PyJWK(key).key
+                    except jwt.PyJWTError as e:
+                        raise OidcError(f"unusable signing key {kid!r}: {e}") from e
+        raise OidcError(f"unknown signing key {kid!r}")
+
+    def _fetch(self, url):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            document = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise OidcError(f"could not fetch {url}: {e}") from e
+        _logger.info("OIDC: fetched %s in %.3fs", url, time.perf_counter() - start)
+        if not isinstance(document, dict):
+            raise OidcError(f"unexpected document at {url}: {json.dumps(document)[:100]}")
+        return document
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import threading
+from collections import defaultdict
+
+
+class OutboxSendError(Exception):
+    """ Failure of a transport having delivered part of a batch before failing.
+
+        Transports raise it to tell which messages were acknowledged, so that they are not
+        sent again; any other exception means that none of the messages was delivered.
+
+        :param sent_ids: ids of the ``hbn.outbox.message`` records delivered
+    """
+
+    def __init__(self, message, sent_ids=()):
+        super().__init__(message)
+        self.sent_ids = set(sent_ids)
+
+
+class LocalTransport:
+    """ Stand-in transport of the notification outbox, keeping the messages in memory
+        instead of sending them. Enabled with ``hbn_outbox_transport = local`` in the
+        configuration file, or by handing it to ``hbn.outbox.message._cron_process``.
+
+        :param fail_channels: channels whose sends raise, to exercise the retries
+        :param fail_attendee_ids: attendees whose messages raise, after the messages
+            preceding them in the batch were delivered
+    """
+
+    def __init__(self, fail_channels=(), fail_attendee_ids=()):
+        self.fail_channels = set(fail_channels)
+        self.fail_attendee_ids = set(fail_attendee_ids)
+        self._lock = threading.Lock()
+        self.sent = []
+        self.calls = []
+
+    def send(self, channel, messages):
+        """ Record the batch of ``messages`` (``hbn.outbox.message`` records) of ``channel``. """
+        with self._lock:
+            self.calls.append((channel, len(messages)))
+        if channel in self.fail_channels:
+            raise ConnectionError(f"local transport: channel {channel} is down")
+        sent_ids = []
+        for message in messages:
+            if message.attendee_id.id in self.fail_attendee_ids:
+                raise OutboxSendError(f"local transport: attendee {message.attendee_id.id} is unreachable", sent_ids)
+            with self._lock:
+                self.sent.append((channel, message.attendee_id.id, message.payload or {}))
+            sent_ids.append(message.id)
+
+    def clear(self):
+        with self._lock:
+            self.sent.clear()
+            self.calls.clear()
+
+
+class BatchMetrics:
+    """ Thread-safe counters of the batches sent per channel: batches, messages, failures
+        and latencies (in seconds).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = defaultdict(lambda: {
+            'batches': 0,
+            'messages': 0,
+            'failures': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'latency_last': 0.0,
+        })
+
+    def record(self, channel, size, latency, success):
+        with self._lock:
+            metrics = self._metrics[channel]
+            metrics['batches'] += 1
+            metrics['messages'] += size
+            metrics['failures'] += not success
+            metrics['latency_total'] += latency
+            metrics['latency_last'] = latency
+            metrics['latency_max'] = max(metrics['latency_max'], latency)
+
+    def snapshot(self):
+        """ Return {channel: counters}, with the average latency of a batch. """
+        with self._lock:
+            snapshot = {channel: dict(metrics) for channel, metrics in self._metrics.items()}
+        for metrics in snapshot.values():
+            metrics['latency_avg'] = metrics['latency_total'] / metrics['batches'] if metrics['batches'] else 0.0
+        return snapshot
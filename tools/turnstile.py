@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import hashlib
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import SharedCache
+
+_logger = logging.getLogger(__name__)
+
+TURNSTILE_VERIFY_URL = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
+# A Turnstile token can be redeemed for 300 seconds after it was issued
+TURNSTILE_TOKEN_VALIDITY = 300
+
+
+class TurnstileUnavailable(Exception):
+    """ The verification endpoint could not give a verdict. """
+
+
+class TurnstileClient:
+    """ Cloudflare Turnstile verification client.
+
+        * connections to the verification endpoint are pooled and kept alive;
+        * verdicts are cached per token for the validity window of the token, so that a
+          retried submission does not call the endpoint again (and is not rejected as a
+          duplicate redemption);
+        * after ``failure_threshold`` consecutive transport errors the circuit opens and
+          verifications fail immediately for ``reset_timeout`` seconds, then one call is
+          let through to probe the endpoint again;
+        * call counts and latencies are exposed through ``get_metrics``.
+
+        :param str url: verification endpoint, may point to a local stand-in server
+        :param float timeout: connect and read timeout of a verification call, in seconds
+    """
+
+    def __init__(self, url=TURNSTILE_VERIFY_URL, timeout=3.0, failure_threshold=5, reset_timeout=30.0,
+                 verdict_ttl=TURNSTILE_TOKEN_VALIDITY, pool_size=4):
+        self.url = url
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.verdicts = SharedCache(maxsize=2048, ttl=verdict_ttl)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._metrics = {
+            'calls': 0,
+            'errors': 0,
+            'cache_hits': 0,
+            'short_circuits': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'latency_last': 0.0,
+        }
+
+    def verify(self, secret, token, remoteip=None):
+        """ Return the verdict of the endpoint for ``token``, as a siteverify response dict. """
+        if not token:
+            return {'success': False, 'error-codes': ['missing-input-response']}
+
+        key = (hashlib.sha256((secret or '').encode()).hexdigest(), token)
+        called = []
+
+        def call():
+            called.append(True)
+            return self._call(secret, token, remoteip)
+
+        try:
+            verdict = self.verdicts.get_or_compute(key, call)
+        except TurnstileUnavailable as e:
+            _logger.warning("Turnstile validation error: %s", e)
+            return {'success': False, 'error-codes': ['internal-error']}
+        if not called:
+            with self._lock:
+                self._metrics['cache_hits'] += 1
+        return verdict
+
+    def get_metrics(self):
+        """ Return a snapshot of the call counters and latencies (in seconds). """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['circuit_open'] = self._opened_at is not None
+        metrics['latency_avg'] = metrics['latency_total'] / metrics['calls'] if metrics['calls'] else 0.0
+        return metrics
+
+    def _allow_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # half-open: let this call probe the endpoint, keep the others out
+                self._opened_at = time.monotonic()
+                return True
+            self._metrics['short_circuits'] += 1
+            return False
+
+    def _record(self, latency, success):
+        with self._lock:
+            self._metrics['calls'] += 1
+            self._metrics['latency_total'] += latency
+            self._metrics['latency_last'] = latency
+            self._metrics['latency_max'] = max(self._metrics['latency_max'], latency)
+            if success:
+                self._consecutive_failures = 0
+                self._opened_at = None
+                return
+            self._metrics['errors'] += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold and self._opened_at is None:
+                _logger.warning("Turnstile: %s consecutive failures, verification suspended for %ss",
+                                self._consecutive_failures, self.reset_timeout)
+                self._opened_at = time.monotonic()
+
+    def _call(self, secret, token, remoteip=None):
+        if not self._allow_call():
+            raise TurnstileUnavailable("circuit open")
+
+        data = {
+            'secret': secret,
+            'response': token,
+        }
+        if remoteip:
+            data['remoteip'] = remoteip
+
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=data, timeout=self.timeout)
+            response.raise_for_status()
+            verdict = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self._record(time.perf_counter() - start, success=False)
+            raise TurnstileUnavailable(str(e)) from e
+        latency = time.perf_counter() - start
+        self._record(latency, success=True)
+        _logger.debug("Turnstile: verdict %s in %.3fs", verdict.get('success'), latency)
+        return verdict